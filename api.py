@@ -0,0 +1,295 @@
+"""Read-only HTTP lookup API for the class directory.
+
+Serves the same snapshots as the Streamlit app: members are loaded and
+normalized by ``directory.SnapshotCache`` and kept fresh by its background
+poller, so requests never reach Google Sheets. Each response is serialized
+once per snapshot version and carries an ETag; a client that sends it
+back in If-None-Match gets an empty 304.
+
+    GET /members                  every member
+    GET /members/{username}       one member, matched case-insensitively
+    GET /search?q=ada             members whose name or username contains q
+
+Add ``?directory=<name>`` to read another configured directory. Settings
+come from .streamlit/secrets.toml, then the environment, as in the app.
+The API is a plain ASGI application; run it with any ASGI server:
+
+    uvicorn api:app --port 8000
+    python api.py --port 8000      # the same, if uvicorn is installed
+"""
+import argparse
+import asyncio
+import hashlib
+import json
+import os
+import threading
+import tomllib
+from collections import namedtuple
+from urllib.parse import parse_qs, unquote
+
+import metrics
+from config import DEFAULT_DIRECTORY, FUZZY_RESULTS, DirectorySettings
+
+SECRETS_PATH = os.path.join(".streamlit", "secrets.toml")
+READ_ONLY_SCOPES = [
+    "https://www.googleapis.com/auth/spreadsheets.readonly",
+    "https://www.googleapis.com/auth/drive.readonly",
+]
+RESPONSE_CACHE_ENTRIES = 1024  # serialized responses kept per directory
+
+Response = namedtuple("Response", ["status", "body", "etag"])
+
+
+def read_secrets(path=SECRETS_PATH):
+    """Settings from a Streamlit secrets file, or {} when there is none"""
+    try:
+        with open(path, "rb") as f:
+            return tomllib.load(f)
+    except FileNotFoundError:
+        return {}
+
+
+def json_response(status, payload):
+    """Response whose ETag is a digest of its body, so equal data gets equal tags across processes"""
+    body = json.dumps(payload, ensure_ascii=False, separators=(",", ":")).encode("utf-8")
+    return Response(status, body, f'"{hashlib.sha1(body).hexdigest()[:20]}"')
+
+
+def etag_matches(if_none_match, etag):
+    """True when an If-None-Match header value names ``etag``"""
+    if if_none_match.strip() == "*":
+        return True
+    tags = (tag.strip() for tag in if_none_match.split(","))
+    return etag in (tag[2:] if tag.startswith("W/") else tag for tag in tags)
+
+
+def members_payload(members):
+    return [member._asdict() for member in members]
+
+
+class LookupAPI:
+    """ASGI application answering member lookups from in-memory directory snapshots"""
+
+    def __init__(self, secrets=None):
+        self.secrets = read_secrets() if secrets is None else secrets
+        self.settings = DirectorySettings(self.get_setting)
+        self._lock = threading.Lock()
+        self._registry = None
+        self._client = None
+        self._quota = None
+        self._worksheets = {}
+        self._responses = None
+
+    def get_setting(self, key, default=None):
+        """Read an optional setting from the secrets file, falling back to the environment"""
+        if key in self.secrets:
+            return self.secrets[key]
+        return os.environ.get(key.upper(), default)
+
+    # -------------------------------------
+    # 📊 DATA LAYER
+    # -------------------------------------
+    def _authorize(self):
+        import gspread
+        from google.oauth2.service_account import Credentials
+
+        sa_info = self.get_setting("gcp_service_account")
+        if isinstance(sa_info, str):
+            sa_info = json.loads(sa_info)
+        if sa_info:
+            creds = Credentials.from_service_account_info(dict(sa_info), scopes=READ_ONLY_SCOPES)
+        elif os.path.exists("service_account.json"):
+            creds = Credentials.from_service_account_file("service_account.json", scopes=READ_ONLY_SCOPES)
+        else:
+            raise RuntimeError("No Google credentials: set gcp_service_account or add service_account.json")
+        return gspread.authorize(creds)
+
+    def _worksheet(self, directory):
+        """A directory's worksheet, opened once per process"""
+        with self._lock:
+            if self._client is None:
+                self._client = self._authorize()
+            worksheet = self._worksheets.get(directory)
+            if worksheet is None:
+                worksheet = self._worksheets[directory] = self.settings.open_worksheet(self._client, directory)
+            return worksheet
+
+    def _forget_worksheet(self, directory):
+        with self._lock:
+            self._worksheets.pop(directory, None)
+
+    def _sheets_quota(self):
+        with self._lock:
+            if self._quota is None:
+                # This process has its own budget; the app and the API share the service account's quota
+                self._quota = self.settings.sheets_quota()
+            return self._quota
+
+    def create_directory_cache(self, directory):
+        """Snapshot cache of one directory, built exactly as the app builds it"""
+        backend = self.settings.create_storage_backend(
+            directory,
+            lambda: self._worksheet(directory),
+            forget=lambda: self._forget_worksheet(directory),
+            quota=self._sheets_quota,
+        )
+        return self.settings.create_directory_cache(directory, backend)
+
+    @property
+    def registry(self):
+        """Snapshot caches of every directory in use, built on first use"""
+        if self._registry is None:
+            from directory import VersionedCache
+
+            with self._lock:
+                if self._registry is None:
+                    self._responses = VersionedCache("api_response", max_entries=RESPONSE_CACHE_ENTRIES)
+                    # The default directory is loaded up front as well as any listed for preloading
+                    self._registry = self.settings.create_registry(
+                        self.create_directory_cache,
+                        on_evict=self._responses.invalidate,
+                        preload=[DEFAULT_DIRECTORY, *self.settings.preload_directories()],
+                    )
+        return self._registry
+
+    def close(self):
+        """Stop every directory's poller"""
+        if self._registry is not None:
+            for directory, *_ in self._registry.status():
+                self._registry.evict(directory)
+
+    # -------------------------------------
+    # 🔍 LOOKUPS
+    # -------------------------------------
+    def route(self, path, params):
+        """(route name, argument) for a request path, or None when nothing is served there"""
+        if path == "/members":
+            return "members", None
+        if path.startswith("/members/"):
+            username = unquote(path[len("/members/"):])
+            if username and "/" not in username:
+                return "member", username.strip().casefold()
+        if path == "/search":
+            return "search", (params.get("q") or [""])[0].strip()
+        return None
+
+    def render(self, directory, snapshot, route, argument):
+        """Response for one route against one snapshot"""
+        if route == "members":
+            return json_response(200, {
+                "directory": directory,
+                "count": len(snapshot.members),
+                "members": members_payload(snapshot.members),
+            })
+        if route == "member":
+            member = snapshot.lookup(argument)
+            if member is None:
+                return json_response(404, {"error": "Username is not in the directory"})
+            return json_response(200, member._asdict())
+
+        results = snapshot.search(argument)
+        fuzzy = not results
+        if fuzzy:
+            results = snapshot.fuzzy_search(argument, FUZZY_RESULTS)
+        return json_response(200, {
+            "directory": directory,
+            "query": argument,
+            "fuzzy": fuzzy,
+            "count": len(results),
+            "members": members_payload(results),
+        })
+
+    async def respond(self, method, path, query_string):
+        """Response to a request, served from the response cache whenever the snapshot is unchanged"""
+        if method not in ("GET", "HEAD"):
+            return "", json_response(405, {"error": "Method not allowed"})
+
+        params = parse_qs(query_string)
+        route = self.route(path, params)
+        if route is None:
+            return "not_found", json_response(404, {"error": "Not found"})
+        name, argument = route
+        if name == "search" and not argument:
+            return name, json_response(400, {"error": "The q parameter is required"})
+
+        directory = (params.get("directory") or [DEFAULT_DIRECTORY])[0]
+        if directory not in self.settings.directories():
+            return name, json_response(404, {"error": f"There is no directory called '{directory}'"})
+
+        cache = self.registry.get(directory)
+        try:
+            if cache.snapshot is None:
+                # Only the first request for a directory waits for a load; keep the event loop free meanwhile
+                snapshot = await asyncio.get_running_loop().run_in_executor(None, cache.get)
+            else:
+                snapshot = cache.get()
+        except Exception as e:
+            return name, json_response(503, {"error": f"Directory is unavailable: {e}"})
+
+        response = self._responses.get(
+            directory, snapshot.version, (name, argument), lambda: self.render(directory, snapshot, name, argument)
+        )
+        return name, response
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] == "lifespan":
+            await self._lifespan(receive, send)
+            return
+        if scope["type"] != "http":
+            return
+
+        route, response = await self.respond(
+            scope["method"], scope["path"], scope.get("query_string", b"").decode("latin-1")
+        )
+        request_headers = dict(scope.get("headers") or [])
+        if_none_match = request_headers.get(b"if-none-match", b"").decode("latin-1")
+        status, body = response.status, response.body
+        if status == 200 and if_none_match and etag_matches(if_none_match, response.etag):
+            status, body = 304, b""
+        metrics.inc("api_requests", route=route or "other", status=status)
+
+        headers = [
+            (b"etag", response.etag.encode("latin-1")),
+            # Clients may keep responses but must revalidate them; a 304 costs almost nothing
+            (b"cache-control", b"no-cache"),
+        ]
+        if status != 304:
+            headers += [
+                (b"content-type", b"application/json; charset=utf-8"),
+                (b"content-length", str(len(body)).encode("latin-1")),
+            ]
+        if status == 405:
+            headers.append((b"allow", b"GET, HEAD"))
+        await send({"type": "http.response.start", "status": status, "headers": headers})
+        await send({"type": "http.response.body", "body": b"" if scope["method"] == "HEAD" else body})
+
+    async def _lifespan(self, receive, send):
+        while True:
+            message = await receive()
+            if message["type"] == "lifespan.startup":
+                # Builds the registry, which starts loading directories before the first request
+                self.registry
+                await send({"type": "lifespan.startup.complete"})
+            elif message["type"] == "lifespan.shutdown":
+                self.close()
+                await send({"type": "lifespan.shutdown.complete"})
+                return
+
+
+app = LookupAPI()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8000)
+    args = parser.parse_args()
+    try:
+        import uvicorn
+    except ImportError:
+        raise SystemExit("api.py needs an ASGI server to run: pip install uvicorn")
+    uvicorn.run(app, host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -1,15 +1,23 @@
+import time
+SCRIPT_STARTED = time.perf_counter()  # first paint is measured from here
+
 import streamlit as st
-import pandas as pd
-import gspread
-from google.oauth2.service_account import Credentials
 import json
-import time
 from datetime import datetime, timedelta
-import re
 import os
 import streamlit.components.v1 as components
 from urllib.parse import quote
 import hashlib
+import hmac
+import functools
+import random
+from contextlib import nullcontext
+
+import metrics
+from config import DEFAULT_DIRECTORY, FUZZY_RESULTS, DirectorySettings
+from validation import validate_linkedin_username, validate_name
+# directory, quota and storage pull in numpy, gspread and google-auth. They
+# are imported where first needed, after the header has been painted.
 
 # -------------------------------------
 # ⚙️ APP CONFIG & CONSTANTS
@@ -22,364 +30,49 @@ st.set_page_config(
 )
 
 # Constants
-SHEET_NAME = "myconnections"
-WORKSHEET_INDEX = 0
-MAX_NAME_LENGTH = 50
-MAX_USERNAME_LENGTH = 100
+CARD_CACHE_ENTRIES = 5000  # rendered cards kept per directory
+SEARCH_CACHE_ENTRIES = 64  # search results kept per directory
+REFRESH_MIN_AGE = 2  # seconds; Refresh clicks on a younger snapshot fetch nothing
 RATE_LIMIT_WINDOW = 30  # seconds
 MAX_REQUESTS_PER_WINDOW = 5
+DIRECTORY_PAGE_SIZE = 25  # profile cards per directory page
+LIVE_CHECK_INTERVAL = 5  # seconds between each session's check for a new version
+PROFILE_DIR = ".cache/profiles"  # cProfile captures of reruns, newest kept
+KEEP_PROFILES = 20
 
 # -------------------------------------
 # 🎨 BEAUTIFUL DARK/LIGHT THEME WITH CENTERED TOGGLE
 # -------------------------------------
-st.markdown("""
-<style>
-    /* Beautiful Color System */
-    :root {
-        /* Light Theme */
-        --primary-bg: #ffffff;
-        --secondary-bg: #f8f9fa;
-        --card-bg: #ffffff;
-        --text-primary: #1a1a1a;
-        --text-secondary: #666666;
-        --text-muted: #888888;
-        --accent-primary: #2563eb;
-        --accent-hover: #1d4ed8;
-        --border-color: #e5e7eb;
-        --shadow: 0 1px 3px rgba(0,0,0,0.1);
-        --shadow-hover: 0 4px 12px rgba(0,0,0,0.15);
-        
-        /* Success/Warning/Error */
-        --success-color: #10b981;
-        --warning-color: #f59e0b;
-        --error-color: #ef4444;
-        --success-bg: rgba(16, 185, 129, 0.1);
-        --warning-bg: rgba(245, 158, 11, 0.1);
-        --error-bg: rgba(239, 68, 68, 0.1);
-    }
-
-    [data-theme="dark"] {
-        /* Dark Theme */
-        --primary-bg: #0f0f0f;
-        --secondary-bg: #1a1a1a;
-        --card-bg: #1e1e1e;
-        --text-primary: #f5f5f5;
-        --text-secondary: #a3a3a3;
-        --text-muted: #737373;
-        --accent-primary: #3b82f6;
-        --accent-hover: #60a5fa;
-        --border-color: #404040;
-        --shadow: 0 1px 3px rgba(0,0,0,0.3);
-        --shadow-hover: 0 4px 12px rgba(0,0,0,0.4);
-        
-        /* Success/Warning/Error */
-        --success-color: #34d399;
-        --warning-color: #fbbf24;
-        --error-color: #f87171;
-        --success-bg: rgba(52, 211, 153, 0.15);
-        --warning-bg: rgba(251, 191, 36, 0.15);
-        --error-bg: rgba(248, 113, 113, 0.15);
-    }
-
-    /* Smooth transitions */
-    * {
-        transition: background-color 0.3s ease, color 0.3s ease, border-color 0.3s ease, box-shadow 0.3s ease;
-    }
-
-    /* Main app background */
-    .main .block-container {
-        background-color: var(--primary-bg);
-        color: var(--text-primary);
-    }
-
-    /* Centered Theme Toggle Button */
-    .theme-toggle {
-        background: var(--card-bg);
-        border: 1px solid var(--border-color);
-        border-radius: 50%;
-        width: 60px;
-        height: 60px;
-        display: flex;
-        align-items: center;
-        justify-content: center;
-        cursor: pointer;
-        box-shadow: var(--shadow);
-        transition: all 0.3s ease;
-        margin: 0 auto;
-    }
-
-    .theme-toggle:hover {
-        transform: scale(1.1);
-        box-shadow: var(--shadow-hover);
-        border-color: var(--accent-primary);
-    }
-
-    .theme-toggle svg {
-        width: 24px;
-        height: 24px;
-        fill: var(--text-primary);
-    }
-
-    /* Layout and Typography */
-    .main-header {
-        font-size: 2.5rem !important;
-        color: var(--accent-primary);
-        text-align: center;
-        font-weight: 700;
-        margin-bottom: 0.5rem;
-        line-height: 1.2;
-        background: linear-gradient(135deg, var(--accent-primary), var(--accent-hover));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-
-    .subtext {
-        text-align: center;
-        color: var(--text-secondary);
-        font-size: 1.1rem;
-        margin-bottom: 1rem;
-        line-height: 1.5;
-        font-weight: 400;
-    }
-
-    /* Enhanced Card Styling */
-    .profile-card {
-        background-color: var(--card-bg);
-        border-radius: 16px;
-        padding: 1.5rem;
-        margin: 1rem 0;
-        border: 1px solid var(--border-color);
-        box-shadow: var(--shadow);
-        transition: all 0.3s ease;
-        backdrop-filter: blur(10px);
-    }
-
-    .profile-card:hover {
-        background-color: var(--secondary-bg);
-        transform: translateY(-4px);
-        box-shadow: var(--shadow-hover);
-        border-color: var(--accent-primary);
-    }
-
-    .profile-card strong {
-        color: var(--text-primary);
-        font-size: 1.2rem;
-        font-weight: 600;
-        display: block;
-        margin-bottom: 0.5rem;
-    }
-
-    .profile-card code {
-        background: var(--secondary-bg);
-        padding: 0.4rem 0.8rem;
-        border-radius: 8px;
-        color: var(--accent-primary);
-        font-family: 'Monaco', 'Menlo', 'Ubuntu Mono', monospace;
-        font-size: 0.9rem;
-        border: 1px solid var(--border-color);
-        font-weight: 500;
-    }
-
-    .profile-card a {
-        color: var(--accent-primary);
-        text-decoration: none;
-        font-weight: 600;
-        border: 2px solid var(--accent-primary);
-        padding: 0.6rem 1.2rem;
-        border-radius: 25px;
-        display: inline-block;
-        margin-top: 1rem;
-        transition: all 0.3s ease;
-        background: transparent;
-    }
-
-    .profile-card a:hover {
-        background-color: var(--accent-primary);
-        color: white;
-        transform: translateY(-2px);
-        box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3);
-    }
-
-    /* Highlight cards */
-    .current-user {
-        border-left: 6px solid #fbbf24;
-        background: linear-gradient(135deg, var(--card-bg), rgba(251, 191, 36, 0.1));
-    }
-
-    .instructor-card {
-        border-left: 6px solid var(--success-color);
-        background: linear-gradient(135deg, var(--card-bg), var(--success-bg));
-    }
-
-    /* Minimalistic Stats Cards */
-    .minimal-stats-card {
-        background: linear-gradient(135deg, var(--card-bg), var(--secondary-bg));
-        color: var(--text-primary);
-        padding: 1.5rem 1rem;
-        border-radius: 16px;
-        text-align: center;
-        border: 1px solid var(--border-color);
-        transition: all 0.3s ease;
-        height: 100%;
-        box-shadow: var(--shadow);
-    }
-
-    .minimal-stats-card:hover {
-        background: linear-gradient(135deg, var(--secondary-bg), var(--card-bg));
-        border-color: var(--accent-primary);
-        transform: translateY(-4px);
-        box-shadow: var(--shadow-hover);
-    }
-
-    .minimal-stats-card h4 {
-        color: var(--text-secondary);
-        font-size: 0.9rem;
-        font-weight: 600;
-        margin-bottom: 1rem;
-        text-transform: uppercase;
-        letter-spacing: 0.5px;
-    }
-
-    .minimal-stats-card h2 {
-        color: var(--accent-primary);
-        font-size: 2.2rem;
-        font-weight: 700;
-        margin: 0;
-        background: linear-gradient(135deg, var(--accent-primary), var(--accent-hover));
-        -webkit-background-clip: text;
-        -webkit-text-fill-color: transparent;
-        background-clip: text;
-    }
-
-    .refresh-indicator {
-        text-align: center;
-        color: var(--text-secondary);
-        font-size: 0.9rem;
-        margin-bottom: 2rem;
-        padding: 0.8rem;
-        background: var(--secondary-bg);
-        border-radius: 12px;
-        border: 1px solid var(--border-color);
-    }
-
-    /* Success/Warning/Error states */
-    .success-box {
-        background: var(--success-bg);
-        border: 1px solid var(--success-color);
-        border-radius: 12px;
-        padding: 1.2rem;
-        margin: 1rem 0;
-        color: var(--success-color);
-    }
-
-    .warning-box {
-        background: var(--warning-bg);
-        border: 1px solid var(--warning-color);
-        border-radius: 12px;
-        padding: 1.2rem;
-        margin: 1rem 0;
-        color: var(--warning-color);
-    }
-
-    .error-box {
-        background: var(--error-bg);
-        border: 1px solid var(--error-color);
-        border-radius: 12px;
-        padding: 1.2rem;
-        margin: 1rem 0;
-        color: var(--error-color);
-    }
-
-    /* Form elements */
-    .stTextInput input, .stTextInput textarea {
-        background: var(--card-bg) !important;
-        color: var(--text-primary) !important;
-        border: 1px solid var(--border-color) !important;
-        border-radius: 12px !important;
-    }
-
-    .stButton button {
-        background: linear-gradient(135deg, var(--accent-primary), var(--accent-hover)) !important;
-        color: white !important;
-        border: none !important;
-        border-radius: 12px !important;
-        font-weight: 600 !important;
-        transition: all 0.3s ease !important;
-    }
-
-    .stButton button:hover {
-        transform: translateY(-2px) !important;
-        box-shadow: 0 4px 12px rgba(59, 130, 246, 0.3) !important;
-    }
-
-    /* Mobile responsiveness */
-    @media (max-width: 768px) {
-        .main-header {
-            font-size: 2rem !important;
-        }
-        .profile-card {
-            padding: 1.2rem;
-            margin: 0.8rem 0;
-        }
-        .minimal-stats-card h2 {
-            font-size: 1.8rem;
-        }
-        .theme-toggle {
-            width: 50px;
-            height: 50px;
-        }
-        .theme-toggle svg {
-            width: 20px;
-            height: 20px;
-        }
-    }
-</style>
-
-<!-- Theme Toggle with System Preference Detection -->
-<script>
-    // Function to set theme
-    function setTheme(theme) {
-        document.documentElement.setAttribute('data-theme', theme);
-        localStorage.setItem('theme', theme);
-    }
-
-    // Initialize theme
-    function initTheme() {
-        const savedTheme = localStorage.getItem('theme');
-        const systemPrefersDark = window.matchMedia('(prefers-color-scheme: dark)').matches;
-        
-        if (savedTheme) {
-            setTheme(savedTheme);
-        } else if (systemPrefersDark) {
-            setTheme('dark');
-        } else {
-            setTheme('light');
-        }
-    }
-
-    // Toggle theme
-    function toggleTheme() {
-        const currentTheme = document.documentElement.getAttribute('data-theme');
-        const newTheme = currentTheme === 'dark' ? 'light' : 'dark';
-        setTheme(newTheme);
-    }
-
-    // Initialize on load
-    document.addEventListener('DOMContentLoaded', initTheme);
-
-    // Listen for system theme changes
-    window.matchMedia('(prefers-color-scheme: dark)').addEventListener('change', e => {
-        if (!localStorage.getItem('theme')) {
-            setTheme(e.matches ? 'dark' : 'light');
-        }
-    });
-</script>
-""", unsafe_allow_html=True)
+# The stylesheet and script live in static/ and are served by Streamlit's
+# static file server (enabled in .streamlit/config.toml), so the browser
+# fetches and caches them once instead of receiving them on every rerun.
+STATIC_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), "static")
+
+@st.cache_resource
+def static_asset_url(filename):
+    """URL of a file in static/, versioned by its content so a deploy busts the browser cache"""
+    with open(os.path.join(STATIC_DIR, filename), "rb") as f:
+        digest = hashlib.sha1(f.read()).hexdigest()[:10]
+    return f"app/static/{filename}?v={digest}"
+
+st.markdown(
+    f'<link rel="stylesheet" href="{static_asset_url("theme.css")}">'
+    f'<script src="{static_asset_url("theme.js")}" defer></script>',
+    unsafe_allow_html=True,
+)
 
 # -------------------------------------
 # 🔧 ENHANCED UTILITY FUNCTIONS
 # -------------------------------------
+def get_setting(key, default=None):
+    """Read an optional setting from Streamlit secrets, falling back to the environment"""
+    try:
+        if key in st.secrets:
+            return st.secrets[key]
+    except FileNotFoundError:
+        pass
+    return os.environ.get(key.upper(), default)
+
 def initialize_session_state():
     """Initialize all session state variables with proper defaults"""
     defaults = {
@@ -391,7 +84,10 @@ def initialize_session_state():
         'user_searches': {},
         'data_loaded': False,
         'search_query': '',
-        'active_tab': 'directory'
+        'active_tab': 'directory',
+        'directory_page': 0,
+        'directory_page_query': '',
+        'rendered_version': 0
     }
     
     for key, value in defaults.items():
@@ -420,67 +116,106 @@ def rate_limit_check():
     st.session_state.request_count += 1
     return True
 
-def sanitize_input(text, max_length=100):
-    """Sanitize user input to prevent XSS and other attacks"""
-    if not text:
-        return ""
-    
-    # Remove potentially dangerous characters
-    text = str(text).strip()
-    text = re.sub(r'[<>"\'&]', '', text)
-    
-    # Limit length
-    if len(text) > max_length:
-        text = text[:max_length]
-    
-    return text
+def safe_linkedin_url(username):
+    """Generate safe LinkedIn URL with proper encoding"""
+    safe_username = quote(username)
+    return f"https://www.linkedin.com/in/{safe_username}/"
 
-def validate_name(name):
-    """Enhanced name validation"""
-    name = sanitize_input(name, MAX_NAME_LENGTH)
-    
-    if not name:
-        return False, "Name cannot be empty"
+# Cards of a page are joined into one markdown block, so the template must not
+# contain blank lines (they would end the HTML block) or leading indentation.
+PROFILE_CARD_TEMPLATE = """<div class="{card_class}" role="article" aria-label="{aria_label}">
+<div style="display:flex;justify-content:space-between;align-items:flex-start;gap: 1rem;">
+<div style="flex: 1;">
+<strong>{name}</strong><br>
+<code>@{username}</code>
+</div>
+<div style="font-size: 0.9rem; color: var(--text-secondary);">{badge}</div>
+</div>
+<a href="{url}" target="_blank" rel="noopener noreferrer" aria-label="View LinkedIn profile of {name}">
+🔗 View LinkedIn Profile
+</a>
+</div>"""
+
+def render_profile_card(name, username, is_current=False):
+    """Render one directory profile card as HTML"""
+    card_class = "profile-card"
+    badge = "👤"
+    aria_label = f"Profile card for {name}"
     
-    if len(name) < 2:
-        return False, "Name must be at least 2 characters long"
+    # Highlight current user
+    if is_current:
+        card_class += " current-user"
+        badge = "⭐ YOU"
+        aria_label += " - This is you"
     
-    if len(name) > MAX_NAME_LENGTH:
-        return False, f"Name must be less than {MAX_NAME_LENGTH} characters"
+    return PROFILE_CARD_TEMPLATE.format(
+        card_class=card_class,
+        aria_label=aria_label,
+        name=name,
+        username=username,
+        badge=badge,
+        url=safe_linkedin_url(username),
+    )
+
+@st.cache_resource
+def get_card_cache():
+    """Rendered profile cards per directory and snapshot version, shared by every session"""
+    from directory import VersionedCache
     
-    # Allow letters, spaces, hyphens, apostrophes
-    if not re.match(r'^[a-zA-Z\s\-\'\.]+$', name):
-        return False, "Name can only contain letters, spaces, hyphens, and apostrophes"
-    
-    return True, "Valid"
+    return VersionedCache("card", max_entries=CARD_CACHE_ENTRIES)
 
-def validate_linkedin_username(username):
-    """Enhanced LinkedIn username validation"""
-    username = sanitize_input(username, MAX_USERNAME_LENGTH)
-    
-    if not username:
-        return False, "Username cannot be empty"
-    
-    if " " in username:
-        return False, "Username cannot contain spaces"
+@st.cache_resource
+def get_search_cache():
+    """Directory search results per directory and snapshot version, shared by every session"""
+    from directory import VersionedCache
     
-    # Enhanced pattern for LinkedIn usernames
-    pattern = r'^[a-zA-Z0-9\-_\.]+$'
-    if not re.match(pattern, username):
-        return False, "Invalid characters. Use only letters, numbers, hyphens, underscores, and periods"
+    return VersionedCache("search", max_entries=SEARCH_CACHE_ENTRIES)
+
+def render_cached_card(directory, version, name, username, is_current=False):
+    """Profile card HTML, reused across sessions until the directory's snapshot changes.
+
+    The highlighted "YOU" card is specific to one session and is rendered fresh.
+    """
+    if is_current:
+        return render_profile_card(name, username, is_current=True)
+    return get_card_cache().get(directory, version, (username, name), lambda: render_profile_card(name, username))
+
+def forget_directory(directory):
+    """Drop every cached value derived from ``directory``"""
+    get_card_cache().invalidate(directory)
+    get_search_cache().invalidate(directory)
+
+@st.cache_resource
+def get_profiler():
+    """Process-wide rerun profiler; only imported once profiling is used"""
+    from profiling import RerunProfiler
     
-    if len(username) < 3:
-        return False, "Username too short (min 3 characters)"
-    
-    if len(username) > MAX_USERNAME_LENGTH:
-        return False, f"Username too long (max {MAX_USERNAME_LENGTH} characters)"
-    
-    return True, "Valid"
-
-def safe_linkedin_url(username):
-    """Generate safe LinkedIn URL with proper encoding"""
-    safe_username = quote(username)
-    return f"https://www.linkedin.com/in/{safe_username}/"
+    return RerunProfiler(get_setting("profile_dir", PROFILE_DIR), keep=int(get_setting("keep_profiles", KEEP_PROFILES)))
+
+def rerun_profile(label="rerun"):
+    """Context profiling this rerun if it is picked for profiling, else a no-op.
+
+    The profile_reruns setting picks that share (0 to 1) of every rerun; an
+    admin can also profile all of their own session's reruns.
+    """
+    share = float(get_setting("profile_reruns", 0) or 0)
+    if st.session_state.get("admin_profile_session") or (share > 0 and random.random() < share):
+        return get_profiler().capture(label)
+    return nullcontext()
+
+def profiled(section):
+    """Profile a page section's own reruns; a fragment rerun skips the script's top-level profiling"""
+    def decorate(render):
+        @functools.wraps(render)
+        def wrapper(*args, **kwargs):
+            with rerun_profile(section):
+                return render(*args, **kwargs)
+        return wrapper
+    return decorate
+
+def change_directory_page(step):
+    """Button callback moving the directory view by ``step`` pages"""
+    st.session_state.directory_page = max(0, st.session_state.directory_page + step)
 
 # -------------------------------------
 # 🧩 ENHANCED GOOGLE SHEETS SETUP
@@ -488,6 +223,13 @@ def safe_linkedin_url(username):
 @st.cache_resource(ttl=600)
 def get_gspread_client():
     """Enhanced Google Sheets client with better error handling"""
+    with metrics.span("auth"):
+        return _authorize_gspread()
+
+def _authorize_gspread():
+    import gspread
+    from google.oauth2.service_account import Credentials
+    
     try:
         # Check if we're in Streamlit Cloud or have secrets available
         if "gcp_service_account" in st.secrets:
@@ -541,44 +283,90 @@ def get_gspread_client():
         st.info("💡 Check the setup guide in the documentation below.")
         return None
 
-def load_data(sheet):
-    """Enhanced data loading with validation and error handling"""
+# -------------------------------------
+# 🏫 DIRECTORIES
+# -------------------------------------
+# Sheet, database and warm-start file of each directory come from config.py,
+# which the lookup API (api.py) shares
+DIRECTORY_SETTINGS = DirectorySettings(get_setting)
+
+def get_directories():
+    """Configured directories by name; "default" is the one set up by the top-level settings"""
+    return DIRECTORY_SETTINGS.directories()
+
+def current_directory():
+    """Directory selected by the ?directory= query parameter"""
+    return st.query_params.get("directory", DEFAULT_DIRECTORY)
+
+@st.cache_resource(ttl=600)
+def get_worksheet(directory=DEFAULT_DIRECTORY):
+    """Resolve a directory's worksheet once per process"""
+    client = get_gspread_client()
+    if client is None:
+        return None
+    
+    with metrics.span("worksheet_open"):
+        return DIRECTORY_SETTINGS.open_worksheet(client, directory)
+
+@st.cache_resource
+def get_sheets_quota():
+    """One budget for the whole process, since every directory and session shares the service account"""
+    return DIRECTORY_SETTINGS.sheets_quota()
+
+def create_storage_backend(directory):
+    """Storage of one directory, selected by the storage_backend setting"""
+    with metrics.span("import_data_layer"):
+        import storage  # the slow import; config.py then builds the backend from it
+    
+    return DIRECTORY_SETTINGS.create_storage_backend(
+        directory, lambda: get_worksheet(directory), forget=get_worksheet.clear, quota=get_sheets_quota
+    )
+
+def create_directory_cache(directory):
+    """Snapshot cache of one directory, shared by every session viewing it"""
+    return DIRECTORY_SETTINGS.create_directory_cache(directory, create_storage_backend(directory))
+
+@st.cache_resource
+def get_directory_registry():
+    """Process-wide snapshot caches of every directory in use, least recently used evicted first"""
+    return DIRECTORY_SETTINGS.create_registry(
+        create_directory_cache, on_evict=forget_directory, preload=DIRECTORY_SETTINGS.preload_directories()
+    )
+
+def get_directory_cache(directory=None):
+    """Snapshot cache of ``directory``, by default the one this page shows"""
+    return get_directory_registry().get(directory or current_directory())
+
+def rerun_if_stale():
+    """Rerun the page once the shared snapshot moves past the version it was rendered from"""
+    # Only looks: checking must not keep a directory in memory or reload one
+    # that was evicted; the next real page load does that
+    cache = get_directory_registry().peek(current_directory())
+    if cache is not None and cache.version != st.session_state.rendered_version:
+        st.rerun(scope="app")
+
+@st.fragment(run_every=LIVE_CHECK_INTERVAL)
+def live_update_watcher():
+    """Pick up changes made by other sessions and the background poller"""
+    rerun_if_stale()
+
+def load_data():
+    """Return the shared directory snapshot, fetching only when it is stale"""
     try:
-        data = sheet.get_all_records()
-        df = pd.DataFrame(data)
-        
-        if df.empty:
-            df = pd.DataFrame(columns=["name", "username", "timestamp"])
-        
-        # Validate and clean data
-        required_columns = ["name", "username", "timestamp"]
-        for col in required_columns:
-            if col not in df.columns:
-                df[col] = ""
-        
-        # Clean and validate existing data
-        df = df.dropna()  # Remove empty rows
-        df["name"] = df["name"].astype(str).str.strip()
-        df["username"] = df["username"].astype(str).str.strip()
-        
-        # Remove duplicates (case-insensitive)
-        df = df.drop_duplicates(subset=["username"], keep="last")
-        
-        # Validate timestamps
-        try:
-            df["timestamp"] = pd.to_datetime(df["timestamp"]).dt.strftime("%Y-%m-%d %H:%M:%S")
-        except:
-            df["timestamp"] = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        
+        snapshot = get_directory_cache().get()
         st.session_state.data_loaded = True
-        return df
+        return snapshot
         
     except Exception as e:
+        from directory import empty_snapshot
         st.error(f"📊 Error loading data: {str(e)}")
-        return pd.DataFrame(columns=["name", "username", "timestamp"])
+        return empty_snapshot()
 
-def add_user(sheet, name, username):
+def add_user(name, username):
     """Enhanced user addition with case-insensitive duplicate checking"""
+    from quota import QuotaExceededError
+    from storage import DuplicateUsernameError
+    
     if not rate_limit_check():
         return "rate_limited", "Too many requests. Please wait a moment."
     
@@ -594,37 +382,398 @@ def add_user(sheet, name, username):
     if not username_valid:
         return "invalid_username", username_msg
     
+    cache = get_directory_cache()
     try:
-        # Case-insensitive duplicate check
-        existing_data = sheet.get_all_records()
-        for row in existing_data:
-            existing_username = str(row.get("username", "")).strip().lower()
-            if existing_username == username.lower():
+        with cache.append_lock:
+            # Case-insensitive duplicate check against the username index
+            if cache.get().lookup(username) is not None:
                 return "exists", "This username already exists in the directory"
-        
-        # Add new user
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        sheet.append_row([name, username, timestamp])
-        
-        # Invalidate cache to force refresh
-        st.cache_data.clear()
+            
+            # Add new user
+            # Applied to the shared snapshot right away; the next sync checks it landed
+            cache.append([name, username, datetime.now().strftime("%Y-%m-%d %H:%M:%S")])
         
         return "added", "Successfully added to directory"
         
+    except DuplicateUsernameError:
+        return "exists", "This username already exists in the directory"
+    except QuotaExceededError as e:
+        return "rate_limited", f"The directory is busy right now. Please try again in {max(1, round(e.retry_after))} seconds."
     except Exception as e:
         return "error", f"Error adding user: {str(e)}"
 
-def search_users(df, query):
-    """Enhanced search functionality"""
+def bulk_import(data):
+    """Import members from CSV bytes; returns (result, message, rejected rows)"""
+    from importer import import_members, read_members_csv
+    from storage import DuplicateUsernameError
+    
+    try:
+        rows = read_members_csv(data)
+    except (UnicodeDecodeError, ValueError) as e:
+        return "invalid_file", f"Could not read the CSV file: {e}", []
+    if not rows:
+        return "invalid_file", "The CSV file has no rows to import", []
+    
+    try:
+        report = import_members(get_directory_cache(), rows)
+    except DuplicateUsernameError:
+        return "error", "Someone added one of these usernames during the import; nothing was imported. Please retry.", []
+    except Exception as e:
+        return "error", f"Error importing members: {str(e)}", []
+    
+    return "imported", f"Added {len(report.added)} of {len(rows)} rows ({len(report.rejected)} rejected)", report.rejected
+
+def search_users(snapshot, query, directory=None):
+    """Enhanced search functionality backed by the snapshot's substring index"""
     if not query:
-        return df
+        return snapshot.members
+    
+    with metrics.span("search"):
+        return get_search_cache().get(
+            directory or current_directory(), snapshot.version, query.strip().casefold(), lambda: snapshot.search(query)
+        )
+
+def refresh_directory():
+    """Refresh button callback: one shared revalidation of this page's directory"""
+    try:
+        get_directory_cache().revalidate(full=True, min_age=REFRESH_MIN_AGE)
+    except Exception:
+        # The page reports the cache's last error in its degraded-mode banner
+        pass
+
+# -------------------------------------
+# 🛠️ ADMIN PANEL
+# -------------------------------------
+def render_admin_panel():
+    """Sidebar admin sign-in and per-process metrics, enabled by the admin_password secret"""
+    admin_password = get_setting("admin_password")
+    if not admin_password:
+        return
+    
+    with st.sidebar:
+        if not st.session_state.admin_authenticated:
+            with st.form("admin_login_form", clear_on_submit=True):
+                password = st.text_input("Admin password", type="password", key="admin_password_input")
+                if st.form_submit_button("Sign in", use_container_width=True):
+                    if hmac.compare_digest(password.encode(), str(admin_password).encode()):
+                        st.session_state.admin_authenticated = True
+                        st.rerun()
+                    else:
+                        st.error("Incorrect password")
+            return
+        
+        st.subheader("📈 Metrics")
+        st.caption("Aggregated across every session in this process")
+        
+        st.markdown("**Phase timings**")
+        st.table([
+            {"phase": phase, "count": count, "mean ms": round(mean, 1), "max ms": round(worst, 1)}
+            for phase, count, mean, worst, _ in metrics.REGISTRY.timing_rows()
+        ])
+        
+        st.markdown("**Counters**")
+        st.table([
+            {"counter": name, "labels": labels, "value": value}
+            for name, labels, value in metrics.REGISTRY.counter_rows()
+        ])
+        
+        st.markdown("**Directories in memory**")
+        registry = get_directory_registry()
+        st.table([
+            {"directory": name, "members": members, "version": version, "age s": None if age is None else round(age)}
+            for name, members, version, age in registry.status()
+        ])
+        if len(get_directories()) > 1 and st.button("Load all directories", key="admin_prefetch", use_container_width=True):
+            for name, error in registry.prefetch(list(get_directories())).items():
+                st.error(f"{name}: {error}")
+        
+        st.markdown("**Profiling**")
+        st.toggle("Profile my reruns", key="admin_profile_session",
+                  help="Each rerun of this session is captured with cProfile, including reruns of "
+                       "just the search/add or directory section")
+        share = float(get_setting("profile_reruns", 0) or 0)
+        if share:
+            st.caption(f"Also profiling {share:.0%} of all reruns (profile_reruns)")
+        profiles = {profile.name: profile for profile in get_profiler().profiles()}
+        if profiles:
+            from profiling import top_functions
+            chosen = profiles[st.selectbox(
+                "Profile", list(profiles), key="admin_profile_choice",
+            )]
+            try:
+                hottest = top_functions(chosen.path)
+                with open(chosen.path, "rb") as f:
+                    data = f.read()
+            except OSError:
+                st.caption("That profile has just been rotated away")
+            else:
+                st.dataframe([
+                    {"function": row.function, "calls": row.calls, "own ms": round(row.own_ms, 1), "total ms": round(row.total_ms, 1)}
+                    for row in hottest
+                ], hide_index=True, use_container_width=True)
+                st.download_button("⬇️ Download profile", data, file_name=chosen.name, use_container_width=True)
+        
+        prometheus = metrics.REGISTRY.render_prometheus()
+        with st.expander("Prometheus text"):
+            st.code(prometheus, language="text")
+        st.download_button("⬇️ Download metrics", prometheus, file_name="metrics.prom", use_container_width=True)
+        
+        # pandas is only loaded here, to export the directory
+        snapshot = get_directory_cache().snapshot
+        if snapshot is not None:
+            st.download_button("⬇️ Export directory (CSV)", snapshot.members.to_frame().to_csv(index=False),
+                               file_name="directory.csv", mime="text/csv", use_container_width=True)
+        
+        st.markdown("**Bulk import**")
+        upload = st.file_uploader("CSV with name and username columns", type="csv", key="admin_import_file")
+        if upload is not None and st.button("Import members", key="admin_import", use_container_width=True):
+            result, message, rejected = bulk_import(upload.getvalue())
+            if result == "imported":
+                st.success(message)
+            else:
+                st.error(message)
+            if rejected:
+                from importer import rejections_csv
+                st.dataframe([row._asdict() for row in rejected], hide_index=True, use_container_width=True)
+                st.download_button("⬇️ Download rejected rows", rejections_csv(rejected),
+                                   file_name="rejected.csv", mime="text/csv", use_container_width=True)
+        
+        col1, col2 = st.columns(2)
+        with col1:
+            if st.button("Reset", key="admin_reset_metrics", use_container_width=True):
+                metrics.REGISTRY.reset()
+                st.rerun()
+        with col2:
+            if st.button("Sign out", key="admin_sign_out", use_container_width=True):
+                st.session_state.admin_authenticated = False
+                st.rerun()
+
+# -------------------------------------
+# 🧩 PAGE SECTIONS
+# -------------------------------------
+# Each section is a fragment: using its widgets reruns only that section,
+# against the snapshot the whole page was last rendered from.
+def rerun_page(flash_key, kind, message):
+    """Rerun the whole page, then show ``message`` where ``show_flash(flash_key)`` is called"""
+    st.session_state[f"{flash_key}_flash"] = (kind, message)
+    st.rerun(scope="app")
+
+def show_flash(flash_key):
+    """Show the message left by ``rerun_page`` for ``flash_key``, once"""
+    flash = st.session_state.pop(f"{flash_key}_flash", None)
+    if flash is None:
+        return
+    kind, message = flash
+    if kind == "success":
+        st.success(message)
+    else:
+        st.markdown(message, unsafe_allow_html=True)
+
+@st.fragment
+def render_class_stats(members):
+    """Total, unique and active member cards"""
+    col1, col2, col3 = st.columns(3)
+    with col1:
+        st.markdown(f'''
+        <div class="minimal-stats-card" role="region" aria-label="Total Members">
+            <h4>Total</h4>
+            <h2>{len(members)}</h2>
+        </div>
+        ''', unsafe_allow_html=True)
+    with col2:
+        st.markdown(f'''
+        <div class="minimal-stats-card" role="region" aria-label="Unique Members">
+            <h4>Unique</h4>
+            <h2>{members.unique("name")}</h2>
+        </div>
+        ''', unsafe_allow_html=True)
+    with col3:
+        active_count = len(members)  # You can enhance this with actual activity tracking
+        st.markdown(f'''
+        <div class="minimal-stats-card" role="region" aria-label="Active Members">
+            <h4>Active</h4>
+            <h2>{active_count}</h2>
+        </div>
+        ''', unsafe_allow_html=True)
+
+@st.fragment
+@profiled("search_add")
+def search_add_section(snapshot):
+    """Username lookup and add form"""
+    # Tab interface for better UX
+    tab1, tab2 = st.tabs(["🔍 Search Directory", "➕ Add New Profile"])
+    
+    with tab1:
+        with st.form("search_form", clear_on_submit=True):
+            search_username = st.text_input(
+                "LinkedIn username:",
+                placeholder="e.g. john-doe-123",
+                help="Enter your LinkedIn username (the part after linkedin.com/in/)",
+                key="search_username_input"
+            )
+            
+            col1, col2 = st.columns([1, 3])
+            with col1:
+                submitted = st.form_submit_button(
+                    "Search",
+                    use_container_width=True,
+                    type="primary"
+                )
+            
+            if submitted:
+                if search_username:
+                    user_data = snapshot.lookup(search_username)
+                    if user_data is not None:
+                        feedback = f'''
+                        <div class="success-box">
+                            <strong>✅ Found!</strong> You are listed as <strong>{user_data.name}</strong>.
+                        </div>
+                        '''
+                        current_username = search_username.strip()
+                    else:
+                        feedback = '''
+                        <div class="warning-box">
+                            <strong>❌ Not found!</strong> This username is not in the directory yet.
+                        </div>
+                        '''
+                        current_username = None
+                    st.session_state.search_performed = True
+                    if current_username != st.session_state.current_username:
+                        # The directory highlights the current user, so it has to be redrawn too
+                        st.session_state.current_username = current_username
+                        rerun_page("search", "markdown", feedback)
+                    st.markdown(feedback, unsafe_allow_html=True)
+                else:
+                    st.error("Please enter a username to search")
+            show_flash("search")
+
+    with tab2:
+        with st.form("add_form", clear_on_submit=True):
+            name_input = st.text_input(
+                "Your full name:",
+                placeholder="e.g. John Doe",
+                help="Enter your real name as you'd like it to appear in the directory",
+                key="add_name_input"
+            )
+            
+            username_input = st.text_input(
+                "LinkedIn username:",
+                placeholder="e.g. john-doe-123",
+                help="Your LinkedIn username (from linkedin.com/in/your-username)",
+                key="add_username_input"
+            )
+            
+            agreed = st.checkbox(
+                "I confirm my LinkedIn username is correct and I have permission to share this information",
+                key="consent_checkbox"
+            )
+            
+            if st.form_submit_button("Add to Directory", use_container_width=True, type="primary"):
+                if not name_input or not username_input:
+                    st.error("Please fill in both name and username fields.")
+                elif not agreed:
+                    st.error("Please confirm your username and permissions.")
+                else:
+                    with st.spinner("Adding to directory..."):
+                        result, message = add_user(name_input, username_input)
+                        if result == "added":
+                            st.session_state.current_username = username_input.strip()
+                            st.session_state.search_performed = False
+                            # The directory opens on the page holding the new card
+                            st.session_state.directory_focus = username_input.strip()
+                            # Every section counts or lists the new member; redraw them from the
+                            # cached snapshot, which already includes it
+                            rerun_page("add", "success", "🎉 Added successfully! Your card is now in the directory below.")
+                        elif result == "exists":
+                            st.info(f"ℹ️ {message}")
+                        elif result == "rate_limited":
+                            st.warning(f"⏳ {message}")
+                        else:
+                            st.error(f"❌ {message}")
+            show_flash("add")
+
+@st.fragment
+@profiled("directory")
+def directory_section(snapshot, directory):
+    """Searchable, paged directory of profile cards"""
+    # After a Refresh, redraw every section from the new snapshot rather than just this one
+    rerun_if_stale()
+    members = snapshot.members
+    page_size = max(1, int(get_setting("directory_page_size", DIRECTORY_PAGE_SIZE)))
+    
+    # Show a member who just added themselves: clear the search and open their page
+    focus = st.session_state.pop("directory_focus", None)
+    position = None if focus is None else snapshot.username_index.get(focus.casefold())
+    if position is not None:
+        st.session_state.directory_search = ""
+        st.session_state.directory_page_query = ""
+        st.session_state.directory_page = position // page_size
     
-    query = query.lower().strip()
-    results = df[
-        df["name"].str.lower().str.contains(query, na=False) |
-        df["username"].str.lower().str.contains(query, na=False)
-    ]
-    return results
+    # Enhanced directory controls
+    col1, col2 = st.columns([3, 1])
+    with col1:
+        search_query = st.text_input(
+            "Search directory:",
+            placeholder="Search by name or username...",
+            key="directory_search",
+            label_visibility="collapsed"
+        )
+    with col2:
+        # The click's own rerun renders the refreshed snapshot
+        st.button("🔄 Refresh", use_container_width=True, on_click=refresh_directory)
+
+    # Display directory with search, falling back to the closest names on a miss
+    shown = search_users(snapshot, search_query, directory) if search_query else members
+    fuzzy = False
+    if search_query and not shown:
+        shown = snapshot.fuzzy_search(search_query, FUZZY_RESULTS)
+        fuzzy = bool(shown)
+
+    if shown:
+        # Start from the first page whenever the search changes
+        if st.session_state.directory_page_query != search_query:
+            st.session_state.directory_page_query = search_query
+            st.session_state.directory_page = 0
+        
+        total_pages = -(-len(shown) // page_size)
+        # Stored back, so Previous works at once after the directory shrinks under the current page
+        page = st.session_state.directory_page = min(st.session_state.directory_page, total_pages - 1)
+        start = page * page_size
+        page_members = shown[start:start + page_size]
+        
+        if fuzzy:
+            st.caption(f"No exact matches for '{search_query}'. Showing the {len(shown)} closest members.")
+        elif search_query:
+            st.caption(f"Showing {start + 1}–{start + len(page_members)} of {len(shown)} matches ({len(members)} members)")
+        else:
+            st.caption(f"Showing {start + 1}–{start + len(page_members)} of {len(members)} members")
+        
+        # The whole page goes to the browser as a single element
+        with metrics.span("render_directory"):
+            current = (st.session_state.get("current_username") or "").lower()
+            cards = [
+                render_cached_card(directory, snapshot.version, member.name, member.username,
+                                   is_current=bool(current) and member.username.lower() == current)
+                for member in page_members
+            ]
+            st.markdown("\n".join(cards), unsafe_allow_html=True)
+        metrics.inc("rows_rendered", len(cards))
+        
+        if total_pages > 1:
+            col1, col2, col3 = st.columns([1, 2, 1])
+            with col1:
+                st.button("◀ Previous", key="directory_prev", use_container_width=True,
+                          disabled=page == 0, on_click=change_directory_page, args=(-1,))
+            with col2:
+                st.markdown(f'<div style="text-align: center; padding-top: 0.4rem;">Page {page + 1} of {total_pages}</div>', unsafe_allow_html=True)
+            with col3:
+                st.button("Next ▶", key="directory_next", use_container_width=True,
+                          disabled=page >= total_pages - 1, on_click=change_directory_page, args=(1,))
+    else:
+        if search_query:
+            st.info(f"🔍 No members found matching '{search_query}'. Try a different search term.")
+        else:
+            st.info("👥 No profiles yet. Be the first to add yours!")
 
 # -------------------------------------
 # 🎯 MAIN APPLICATION
@@ -633,11 +782,19 @@ def main():
     # Initialize session state
     initialize_session_state()
     
+    directory = current_directory()
+    if directory not in get_directories():
+        st.error(f"🚫 There is no directory called '{directory}'. Check the link you were given.")
+        return
+    render_admin_panel()
+    
     # -------------------------------
     # 🧭 Header Section
     # -------------------------------
     st.markdown('<h1 class="main-header" aria-label="My Connections">🔗 My Connections</h1>', unsafe_allow_html=True)
     st.markdown('<div class="subtext">Search, add, and connect with your classmates instantly.</div>', unsafe_allow_html=True)
+    if directory != DEFAULT_DIRECTORY:
+        st.caption(f"📚 {get_directories()[directory].get('title', directory)}")
 
     refresh_time = datetime.now().strftime("%H:%M:%S")
     st.markdown(f'<div class="refresh-indicator" aria-live="polite">🔄 Last updated: {refresh_time}</div>', unsafe_allow_html=True)
@@ -652,13 +809,13 @@ def main():
         </div>
     </div>
     """, unsafe_allow_html=True)
+    metrics.REGISTRY.observe("first_paint", time.perf_counter() - SCRIPT_STARTED)
 
     # -------------------------------------
     # 📊 DATA LOADING
     # -------------------------------------
     try:
-        client = get_gspread_client()
-        if client is None:
+        if get_setting("storage_backend", "sheets") == "sheets" and get_gspread_client() is None:
             # Show setup instructions
             with st.expander("🔧 Setup Instructions", expanded=True):
                 st.markdown("""
@@ -702,22 +859,53 @@ def main():
                 **Optional Secrets:**
                 ```toml
                 admin_password = "your-admin-password"
+                sheet_key = "your-spreadsheet-key"  # from the sheet URL; skips the lookup by title
                 instagram_username = "your-instagram"
                 github_username = "your-github"
                 gmail_address = "your-email@gmail.com"
+                snapshot_ttl = 30  # seconds between directory refreshes
+                live_update_interval = 30  # background refresh period; 0 disables it
+                sync_mode = "incremental"  # or "full" to always re-read the sheet
+                storage_backend = "sheets"  # or "sqlite" for a local database, "synthetic" for generated members
+                synthetic_members = 1000  # directory size with storage_backend = "synthetic"
+                profile_reruns = 0.05  # share of reruns captured with cProfile into .cache/profiles
+                sheets_reads_per_minute = 60  # shared by every session of the app
+                sheets_writes_per_minute = 60
+                sqlite_path = "directory.db"
+                snapshot_path = ".cache/directory-snapshot.parquet"  # warm-start copy; "" disables it
+                max_directories = 8  # directory caches kept in memory at once
+                max_cached_members = 200000  # members across those caches before evicting
+                preload_directories = ["cs101"]  # loaded together at startup
+                
+                [directories.cs101]  # another class, served at ?directory=cs101
+                title = "CS 101"
+                sheet_key = "its-spreadsheet-key"  # or sheet_name; omit both to use a worksheet of the main sheet
+                worksheet = 0
                 ```
                 """)
             return
             
-        sheet = client.open(SHEET_NAME).get_worksheet(WORKSHEET_INDEX)
-        
         # Load data with simple spinner
         if not st.session_state.data_loaded:
             with st.spinner("Loading directory data..."):
-                df = load_data(sheet)
+                snapshot = load_data()
         else:
-            df = load_data(sheet)
-            
+            snapshot = load_data()
+        members = snapshot.members
+        st.session_state.rendered_version = snapshot.version
+        live_update_watcher()
+        
+        # Degraded mode: Sheets is failing, so say how old the directory we still serve is
+        from quota import QuotaExceededError
+        last_error = get_directory_cache().last_error
+        if snapshot.version and last_error is not None and not isinstance(last_error, QuotaExceededError):
+            updated = datetime.fromtimestamp(snapshot.fetched_at).strftime("%H:%M:%S")
+            st.markdown(f'''
+            <div class="warning-box" role="status">
+                <strong>⚠️ Google Sheets is unavailable right now.</strong> Showing the directory as of {updated}; it will refresh automatically once the connection recovers.
+            </div>
+            ''', unsafe_allow_html=True)
+
     except Exception as e:
         st.error(f"🚨 Connection Error: Unable to connect to Google Sheets. Error: {str(e)}")
         st.info("💡 Make sure your Google Sheet is shared with the service account email.")
@@ -727,30 +915,7 @@ def main():
     # 📊 CLASS STATS - MINIMALISTIC VERSION
     # -------------------------------------
     st.subheader("Class Overview", anchor="class-overview")
-    
-    col1, col2, col3 = st.columns(3)
-    with col1:
-        st.markdown(f'''
-        <div class="minimal-stats-card" role="region" aria-label="Total Members">
-            <h4>Total</h4>
-            <h2>{len(df)}</h2>
-        </div>
-        ''', unsafe_allow_html=True)
-    with col2:
-        st.markdown(f'''
-        <div class="minimal-stats-card" role="region" aria-label="Unique Members">
-            <h4>Unique</h4>
-            <h2>{df["name"].nunique() if not df.empty else 0}</h2>
-        </div>
-        ''', unsafe_allow_html=True)
-    with col3:
-        active_count = len(df)  # You can enhance this with actual activity tracking
-        st.markdown(f'''
-        <div class="minimal-stats-card" role="region" aria-label="Active Members">
-            <h4>Active</h4>
-            <h2>{active_count}</h2>
-        </div>
-        ''', unsafe_allow_html=True)
+    render_class_stats(members)
 
     st.divider()
 
@@ -758,155 +923,15 @@ def main():
     # 🔍 ENHANCED SEARCH / ADD SECTION
     # -------------------------------------
     st.subheader("🔍 Find or Add Your LinkedIn", anchor="search-add")
-
-    # Tab interface for better UX
-    tab1, tab2 = st.tabs(["🔍 Search Directory", "➕ Add New Profile"])
-    
-    with tab1:
-        with st.form("search_form", clear_on_submit=True):
-            search_username = st.text_input(
-                "LinkedIn username:",
-                placeholder="e.g. john-doe-123",
-                help="Enter your LinkedIn username (the part after linkedin.com/in/)",
-                key="search_username_input"
-            )
-            
-            col1, col2 = st.columns([1, 3])
-            with col1:
-                submitted = st.form_submit_button(
-                    "Search",
-                    use_container_width=True,
-                    type="primary"
-                )
-            
-            if submitted:
-                if search_username:
-                    with st.spinner("Searching directory..."):
-                        time.sleep(0.3)  # Simulate processing
-                        match = df[df["username"].str.lower() == search_username.strip().lower()]
-                        if not match.empty:
-                            user_data = match.iloc[0]
-                            st.markdown(f'''
-                            <div class="success-box">
-                                <strong>✅ Found!</strong> You are listed as <strong>{user_data['name']}</strong>.
-                            </div>
-                            ''', unsafe_allow_html=True)
-                            st.session_state.current_username = search_username.strip()
-                            st.session_state.search_performed = True
-                        else:
-                            st.markdown(f'''
-                            <div class="warning-box">
-                                <strong>❌ Not found!</strong> This username is not in the directory yet.
-                            </div>
-                            ''', unsafe_allow_html=True)
-                            st.session_state.current_username = None
-                            st.session_state.search_performed = True
-                else:
-                    st.error("Please enter a username to search")
-
-    with tab2:
-        with st.form("add_form", clear_on_submit=True):
-            name_input = st.text_input(
-                "Your full name:",
-                placeholder="e.g. John Doe",
-                help="Enter your real name as you'd like it to appear in the directory",
-                key="add_name_input"
-            )
-            
-            username_input = st.text_input(
-                "LinkedIn username:",
-                placeholder="e.g. john-doe-123",
-                help="Your LinkedIn username (from linkedin.com/in/your-username)",
-                key="add_username_input"
-            )
-            
-            agreed = st.checkbox(
-                "I confirm my LinkedIn username is correct and I have permission to share this information",
-                key="consent_checkbox"
-            )
-            
-            if st.form_submit_button("Add to Directory", use_container_width=True, type="primary"):
-                if not name_input or not username_input:
-                    st.error("Please fill in both name and username fields.")
-                elif not agreed:
-                    st.error("Please confirm your username and permissions.")
-                else:
-                    with st.spinner("Adding to directory..."):
-                        result, message = add_user(sheet, name_input, username_input)
-                        if result == "added":
-                            st.success("🎉 Added successfully! Refreshing directory...")
-                            st.session_state.current_username = username_input
-                            st.session_state.search_performed = False
-                            time.sleep(1)
-                            st.rerun()
-                        elif result == "exists":
-                            st.info(f"ℹ️ {message}")
-                        elif result == "rate_limited":
-                            st.warning(f"⏳ {message}")
-                        else:
-                            st.error(f"❌ {message}")
+    search_add_section(snapshot)
 
     st.divider()
 
     # -------------------------------------
     # 📘 ENHANCED CLASS DIRECTORY
     # -------------------------------------
-    st.subheader(f"🗳️ Class Directory ({len(df)} members)", anchor="directory")
-    
-    # Enhanced directory controls
-    col1, col2 = st.columns([3, 1])
-    with col1:
-        search_query = st.text_input(
-            "Search directory:",
-            placeholder="Search by name or username...",
-            key="directory_search",
-            label_visibility="collapsed"
-        )
-    with col2:
-        if st.button("🔄 Refresh", use_container_width=True):
-            st.cache_data.clear()
-            st.session_state.data_loaded = False
-            st.rerun()
-
-    # Display directory with search
-    display_df = search_users(df, search_query) if search_query else df
-
-    if not display_df.empty:
-        st.caption(f"Showing {len(display_df)} of {len(df)} members")
-        
-        for _, row in display_df.iterrows():
-            name, username = row["name"], row["username"]
-            url = safe_linkedin_url(username)
-            
-            card_class = "profile-card"
-            badge = "👤"
-            aria_label = f"Profile card for {name}"
-            
-            # Highlight current user
-            if st.session_state.get("current_username") and username.lower() == st.session_state["current_username"].lower():
-                card_class += " current-user"
-                badge = "⭐ YOU"
-                aria_label += " - This is you"
-            
-            st.markdown(f'''
-            <div class="{card_class}" role="article" aria-label="{aria_label}">
-                <div style="display:flex;justify-content:space-between;align-items:flex-start;gap: 1rem;">
-                    <div style="flex: 1;">
-                        <strong>{name}</strong><br>
-                        <code>@{username}</code>
-                    </div>
-                    <div style="font-size: 0.9rem; color: var(--text-secondary);">{badge}</div>
-                </div>
-                <a href="{url}" target="_blank" rel="noopener noreferrer" aria-label="View LinkedIn profile of {name}">
-                    🔗 View LinkedIn Profile
-                </a>
-            </div>
-            ''', unsafe_allow_html=True)
-    else:
-        if search_query:
-            st.info(f"🔍 No members found matching '{search_query}'. Try a different search term.")
-        else:
-            st.info("👥 No profiles yet. Be the first to add yours!")
+    st.subheader(f"🗳️ Class Directory ({len(members)} members)", anchor="directory")
+    directory_section(snapshot, directory)
 
     st.caption("📱 Tip: On mobile, links open directly in the LinkedIn app!")
     st.divider()
@@ -915,9 +940,9 @@ def main():
     # 🌟 ENHANCED FOOTER
     # -------------------------------------
     
-    instagram_username = st.secrets.get("instagram_username")
-    github_username = st.secrets.get("github_username")
-    gmail_address = st.secrets.get("gmail_address")
+    instagram_username = get_setting("instagram_username")
+    github_username = get_setting("github_username")
+    gmail_address = get_setting("gmail_address")
 
     if instagram_username or github_username or gmail_address:
         footer_html = f'''
@@ -1020,4 +1045,5 @@ def main():
     """, unsafe_allow_html=True)
 
 if __name__ == "__main__":
-    main()
\ No newline at end of file
+    with metrics.span("rerun"), rerun_profile():
+        main()
\ No newline at end of file
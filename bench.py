@@ -0,0 +1,429 @@
+"""Load benchmark for app.py against an in-process fake Google Sheet.
+
+Drives simulated browser sessions through ``main()`` with Streamlit's
+AppTest and reports per-rerun latency percentiles, Sheets API call counts
+and memory. Only the gspread boundary is faked: authentication, the
+worksheet lookup, caching, search and rendering all run the real code.
+
+AppTest keeps one runtime per process, so sessions take turns rerunning
+(round-robin) instead of running in parallel threads; the shared caches
+see the same traffic mix they would in production.
+
+    python bench.py --sessions 20 --members 5000 --reruns 10 --latency 150
+
+``--startup`` instead measures cold starts, each in a fresh interpreter:
+how long the data layer (numpy, gspread) and google-auth take to import,
+when the header is painted and when the first full page is done.
+
+    python bench.py --startup 5 --members 5000
+"""
+import argparse
+import importlib.abc
+import importlib.machinery
+import json
+import os
+import random
+import re
+import statistics
+import subprocess
+import sys
+import threading
+import time
+import resource
+import tracemalloc
+from collections import Counter
+
+from streamlit.testing.v1 import AppTest
+
+import metrics
+from members import generate_members, random_word
+
+APP_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "app.py")
+HEADER = ["name", "username", "timestamp"]
+
+
+# -------------------------------------
+# 🧪 FAKE GOOGLE SHEETS
+# -------------------------------------
+class FakeWorksheet:
+    """In-memory worksheet implementing the gspread calls the app makes.
+
+    Every call is counted and can be delayed by ``latency`` seconds plus up
+    to ``jitter`` seconds of random extra delay, like a Sheets round trip.
+    """
+
+    def __init__(self, rows=(), latency=0.0, jitter=0.0):
+        self.values = [list(HEADER)] + [list(row) for row in rows]
+        self.latency = latency
+        self.jitter = jitter
+        self.calls = Counter()
+        self._lock = threading.Lock()
+
+    def _call(self, method):
+        with self._lock:
+            self.calls[method] += 1
+        delay = self.latency + random.uniform(0, self.jitter)
+        if delay:
+            time.sleep(delay)
+
+    @property
+    def row_count(self):
+        return len(self.values)
+
+    def get_all_records(self, **kwargs):
+        self._call("get_all_records")
+        header = self.values[0]
+        return [dict(zip(header, row)) for row in self.values[1:]]
+
+    def get_all_values(self, **kwargs):
+        self._call("get_all_values")
+        return [list(row) for row in self.values]
+
+    def get_values(self, range_name=None, **kwargs):
+        # gspread pads every row to the width of the widest one
+        self._call("get_values")
+        rows = self._read(range_name or "A:Z")
+        width = max(map(len, rows), default=0)
+        return [row + [""] * (width - len(row)) for row in rows]
+
+    def batch_get(self, ranges, **kwargs):
+        self._call("batch_get")
+        return [self._read(range_name) for range_name in ranges]
+
+    def append_row(self, values, **kwargs):
+        self._call("append_row")
+        with self._lock:
+            self.values.append(list(values))
+
+    def append_rows(self, values, **kwargs):
+        self._call("append_rows")
+        with self._lock:
+            self.values.extend(list(row) for row in values)
+
+    def _read(self, range_name):
+        """Rows of an A1 range such as ``A:C``, ``A5:C5`` or ``A5:C``"""
+        match = re.fullmatch(r"([A-Z]+)(\d*):([A-Z]+)(\d*)", range_name)
+        if match is None:
+            raise ValueError(f"Unsupported range: {range_name}")
+        first = int(match.group(2) or 1)
+        last = int(match.group(4) or len(self.values))
+        width = ord(match.group(3)) - ord(match.group(1)) + 1
+        rows = [list(row[:width]) for row in self.values[first - 1:last]]
+        # Like the Sheets API, leave off trailing empty cells
+        for row in rows:
+            while row and row[-1] == "":
+                row.pop()
+        return rows
+
+
+class FakeSpreadsheet:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def get_worksheet(self, index):
+        self.worksheet._call("get_worksheet")
+        return self.worksheet
+
+    @property
+    def sheet1(self):
+        return self.worksheet
+
+
+class FakeClient:
+    def __init__(self, worksheet):
+        self.worksheet = worksheet
+
+    def open(self, title):
+        self.worksheet._call("open")
+        return FakeSpreadsheet(self.worksheet)
+
+    def open_by_key(self, key):
+        self.worksheet._call("open_by_key")
+        return FakeSpreadsheet(self.worksheet)
+
+
+class PatchOnImport(importlib.abc.MetaPathFinder):
+    """Calls ``patches[name](module)`` right after module ``name`` is first imported"""
+
+    def __init__(self, patches):
+        self.patches = patches
+
+    def find_spec(self, name, path, target=None):
+        patch = self.patches.get(name)
+        if patch is None:
+            return None
+        spec = importlib.machinery.PathFinder.find_spec(name, path)
+        if spec is None or spec.loader is None:
+            return spec
+        exec_module = spec.loader.exec_module
+
+        def exec_and_patch(module):
+            exec_module(module)
+            patch(module)
+
+        spec.loader.exec_module = exec_and_patch
+        return spec
+
+
+def install_fake_sheets(worksheet):
+    """Route gspread authentication to a fake client backed by ``worksheet``.
+
+    Modules that are not imported yet are patched when the app imports
+    them, so --startup still times their first import.
+    """
+    client = FakeClient(worksheet)
+
+    def patch_gspread(gspread):
+        gspread.authorize = lambda credentials: client
+
+    def patch_credentials(service_account):
+        Credentials = service_account.Credentials
+        Credentials.from_service_account_info = classmethod(lambda cls, info, **kwargs: object())
+        Credentials.from_service_account_file = classmethod(lambda cls, path, **kwargs: object())
+
+    patches = {"gspread": patch_gspread, "google.oauth2.service_account": patch_credentials}
+    for name, patch in list(patches.items()):
+        if name in sys.modules:
+            patch(sys.modules[name])
+            del patches[name]
+    if patches:
+        sys.meta_path.insert(0, PatchOnImport(patches))
+    return client
+
+
+# -------------------------------------
+# 👥 SIMULATED SESSIONS
+# -------------------------------------
+class Session:
+    """One browser tab driving the app through AppTest"""
+
+    def __init__(self, session_id, secrets, timeout):
+        self.session_id = session_id
+        self.app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+        for key, value in secrets.items():
+            self.app.secrets[key] = value
+        self.adds = 0
+        self.loaded = False
+
+    def step(self, rng, members, add_ratio):
+        """Perform one user action and rerun the script"""
+        app = self.app
+        roll = rng.random()
+        if not self.loaded:
+            action = "load"
+            self.loaded = True
+        elif roll < add_ratio:
+            action = "add"
+            self.adds += 1
+            app.text_input(key="add_name_input").input(f"Bench User {random_word(rng, 5).title()}")
+            app.text_input(key="add_username_input").input(f"bench-{self.session_id}-{self.adds}-{random_word(rng, 4)}")
+            app.checkbox(key="consent_checkbox").check()
+            app.button(key="FormSubmitter:add_form-Add to Directory").click()
+        elif roll < add_ratio + 0.4:
+            action = "search"
+            name = rng.choice(members)[0] if members else "a"
+            start = rng.randrange(max(1, len(name) - 3))
+            app.text_input(key="directory_search").input(name[start:start + 4])
+        elif roll < add_ratio + 0.6:
+            action = "lookup"
+            username = rng.choice(members)[1] if members else "nobody"
+            app.text_input(key="search_username_input").input(username)
+            app.button(key="FormSubmitter:search_form-Search").click()
+        else:
+            action = "rerun"
+
+        started = time.perf_counter()
+        app.run()
+        elapsed = time.perf_counter() - started
+        if app.exception:
+            raise RuntimeError(f"Session {self.session_id} failed on {action}: {app.exception[0].value}")
+        return action, elapsed
+
+
+def percentile(values, pct):
+    ordered = sorted(values)
+    if not ordered:
+        return 0.0
+    return ordered[min(len(ordered) - 1, int(round(pct / 100 * (len(ordered) - 1))))]
+
+
+def run_benchmark(sessions=10, members=1000, reruns=10, latency=0.1, jitter=0.05,
+                  add_ratio=0.1, snapshot_ttl=30, seed=7, timeout=60, trace_memory=False, snapshot_path=""):
+    """Run the benchmark and return a dict of results"""
+    rng = random.Random(seed)
+    rows = generate_members(members, rng)
+    worksheet = FakeWorksheet(rows, latency=latency, jitter=jitter)
+    install_fake_sheets(worksheet)
+    metrics.REGISTRY.reset()
+
+    secrets = {
+        "gcp_service_account": {"type": "service_account"},
+        "snapshot_ttl": snapshot_ttl,
+        "snapshot_path": snapshot_path,
+    }
+
+    if trace_memory:
+        # Precise Python allocation peaks, at the cost of noticeably slower reruns
+        tracemalloc.start()
+    started = time.perf_counter()
+    clients = [Session(i, secrets, timeout) for i in range(sessions)]
+    timings = {}
+    for _ in range(reruns):
+        for client in clients:
+            action, elapsed = client.step(rng, rows, add_ratio)
+            timings.setdefault(action, []).append(elapsed)
+    wall = time.perf_counter() - started
+    peak = None
+    if trace_memory:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+    every = [t for values in timings.values() for t in values]
+    return {
+        "sessions": sessions,
+        "members": members,
+        "reruns": len(every),
+        "wall_seconds": wall,
+        "latency": {
+            action: {
+                "count": len(values),
+                "p50": percentile(values, 50),
+                "p90": percentile(values, 90),
+                "p99": percentile(values, 99),
+                "max": max(values),
+                "mean": statistics.fmean(values),
+            }
+            for action, values in sorted(timings.items()) + [("all", every)]
+        },
+        "api_calls": dict(worksheet.calls),
+        "phases": metrics.REGISTRY.timing_rows(),
+        "max_rss_mb": resource.getrusage(resource.RUSAGE_SELF).ru_maxrss / 1024,
+        "peak_traced_mb": None if peak is None else peak / 2 ** 20,
+    }
+
+
+def format_report(result):
+    lines = [
+        f"Sessions: {result['sessions']}  Members: {result['members']}  "
+        f"Reruns: {result['reruns']}  Wall: {result['wall_seconds']:.2f}s",
+        "",
+        f"{'action':<8} {'count':>6} {'p50 ms':>9} {'p90 ms':>9} {'p99 ms':>9} {'max ms':>9}",
+    ]
+    for action, stats in result["latency"].items():
+        lines.append(
+            f"{action:<8} {stats['count']:>6} {stats['p50'] * 1000:>9.1f} {stats['p90'] * 1000:>9.1f} "
+            f"{stats['p99'] * 1000:>9.1f} {stats['max'] * 1000:>9.1f}"
+        )
+    lines += ["", f"{'phase':<18} {'count':>6} {'mean ms':>9} {'max ms':>9}"]
+    for phase, count, mean, worst, _ in result["phases"]:
+        lines.append(f"{phase:<18} {count:>6} {mean:>9.1f} {worst:>9.1f}")
+    lines += ["", "Sheets API calls:"]
+    lines += [f"  {method:<16} {count}" for method, count in sorted(result["api_calls"].items())]
+    lines += ["", f"Max RSS: {result['max_rss_mb']:.1f} MB"]
+    if result["peak_traced_mb"] is not None:
+        lines.append(f"Peak traced Python memory: {result['peak_traced_mb']:.1f} MB")
+    return "\n".join(lines)
+
+
+# -------------------------------------
+# 🚀 COLD STARTS
+# -------------------------------------
+def measure_startup(members=1000, latency=0.1, jitter=0.05, seed=7, timeout=60, snapshot_path=""):
+    """Startup timings of this interpreter, which must not have imported the data layer or run the app yet"""
+    worksheet = FakeWorksheet(generate_members(members, random.Random(seed)), latency=latency, jitter=jitter)
+    install_fake_sheets(worksheet)
+    metrics.REGISTRY.reset()
+
+    app = AppTest.from_file(APP_PATH, default_timeout=timeout)
+    app.secrets["gcp_service_account"] = {"type": "service_account"}
+    app.secrets["snapshot_path"] = snapshot_path
+    started = time.perf_counter()
+    app.run()
+    first_render = time.perf_counter() - started
+    if app.exception:
+        raise RuntimeError(f"Startup run failed: {app.exception[0].value}")
+
+    phases = {phase: total for phase, _, _, _, total in metrics.REGISTRY.timing_rows()}
+    return {
+        # The app's own first imports: the data layer (numpy and gspread), then google-auth for the client
+        "imports": phases.get("import_data_layer", 0.0) + phases.get("auth", 0.0),
+        "first_paint": phases.get("first_paint", 0.0),
+        "first_render": first_render,
+        "restored": any(name == "snapshot_restored" for name, _, _ in metrics.REGISTRY.counter_rows()),
+    }
+
+
+def run_startup(runs=5, **options):
+    """Run ``measure_startup`` in ``runs`` fresh interpreters, one after another"""
+    results = []
+    for _ in range(runs):
+        child = subprocess.run(
+            [sys.executable, os.path.abspath(__file__), "--startup-child", json.dumps(options)],
+            capture_output=True, text=True, check=True,
+        )
+        results.append(json.loads(child.stdout.strip().splitlines()[-1]))
+    return results
+
+
+def format_startup_report(results):
+    lines = [f"{'run':>3} {'imports ms':>11} {'first paint ms':>15} {'first render ms':>16}  snapshot"]
+    for i, result in enumerate(results, 1):
+        lines.append(
+            f"{i:>3} {result['imports'] * 1000:>11.1f} {result['first_paint'] * 1000:>15.1f} "
+            f"{result['first_render'] * 1000:>16.1f}  {'restored' if result['restored'] else 'fetched'}"
+        )
+    lines += [
+        "",
+        "imports: the data layer (numpy, gspread) and google-auth, loaded by the app after the header is painted",
+        "first paint: script start to the header; first render: the whole first page",
+    ]
+    return "\n".join(lines)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--sessions", type=int, default=10, help="simulated browser sessions")
+    parser.add_argument("--members", type=int, default=1000, help="rows in the fake sheet")
+    parser.add_argument("--reruns", type=int, default=10, help="reruns per session")
+    parser.add_argument("--latency", type=float, default=100, help="Sheets round trip in ms")
+    parser.add_argument("--jitter", type=float, default=50, help="extra random latency in ms")
+    parser.add_argument("--add-ratio", type=float, default=0.1, help="share of actions that add a member")
+    parser.add_argument("--snapshot-ttl", type=float, default=30, help="snapshot_ttl setting in seconds")
+    parser.add_argument("--seed", type=int, default=7)
+    parser.add_argument("--trace-memory", action="store_true", help="also report tracemalloc peak (slower)")
+    parser.add_argument("--snapshot-path", default="", help="warm-start snapshot file (default: disabled)")
+    parser.add_argument("--startup", type=int, metavar="RUNS", help="measure RUNS cold starts instead")
+    parser.add_argument("--startup-child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.startup_child:
+        print(json.dumps(measure_startup(**json.loads(args.startup_child))))
+        return
+    if args.startup:
+        print(format_startup_report(run_startup(
+            args.startup,
+            members=args.members,
+            latency=args.latency / 1000,
+            jitter=args.jitter / 1000,
+            seed=args.seed,
+            snapshot_path=args.snapshot_path,
+        )))
+        return
+
+    result = run_benchmark(
+        sessions=args.sessions,
+        members=args.members,
+        reruns=args.reruns,
+        latency=args.latency / 1000,
+        jitter=args.jitter / 1000,
+        add_ratio=args.add_ratio,
+        snapshot_ttl=args.snapshot_ttl,
+        seed=args.seed,
+        trace_memory=args.trace_memory,
+        snapshot_path=args.snapshot_path,
+    )
+    print(format_report(result))
+
+
+if __name__ == "__main__":
+    main()
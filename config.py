@@ -0,0 +1,162 @@
+"""Where each class directory lives and how it is loaded, shared by the
+Streamlit app and the lookup API.
+
+Both read the same settings (secrets first, then the environment), so
+they resolve a directory to the same sheet or database, the same
+warm-start file and snapshot source, and build the same storage backend,
+snapshot cache and cache registry with the same defaults.
+"""
+import json
+import os
+import threading
+
+import metrics
+
+SHEET_NAME = "myconnections"
+WORKSHEET_INDEX = 0
+DEFAULT_DIRECTORY = "default"  # served when no directory is asked for
+SQLITE_PATH = "directory.db"
+SNAPSHOT_PATH = ".cache/directory-snapshot.parquet"  # warm-start copy of the directory; "" disables it
+SYNTHETIC_MEMBERS = 1000  # generated members per directory with storage_backend = "synthetic"
+SHEETS_READS_PER_MINUTE = 60  # Google's per-user read quota
+SHEETS_WRITES_PER_MINUTE = 60  # Google's per-user write quota
+SNAPSHOT_TTL = 30  # seconds before a directory is revalidated
+LIVE_UPDATE_INTERVAL = 30  # seconds between background directory refreshes
+FULL_SYNC_EVERY = 20  # incremental syncs between full reloads
+MAX_DIRECTORIES = 8  # directory caches kept in memory at once
+MAX_CACHED_MEMBERS = 200_000  # members across all cached directories before evicting
+FUZZY_RESULTS = 10  # closest matches shown when a search finds nothing
+
+
+class DirectorySettings:
+    """Directory locations resolved through ``get_setting(key, default=None)``"""
+
+    def __init__(self, get_setting):
+        self.get_setting = get_setting
+
+    def directories(self):
+        """Configured directories by name; "default" is the one set up by the top-level settings"""
+        configured = self.get_setting("directories") or {}
+        if isinstance(configured, str):
+            configured = json.loads(configured)
+        return {DEFAULT_DIRECTORY: {}, **{str(name): dict(options) for name, options in configured.items()}}
+
+    def worksheet_location(self, directory):
+        """(sheet key, sheet name, worksheet index) holding a directory"""
+        options = self.directories()[directory]
+        sheet_key = options.get("sheet_key")
+        sheet_name = options.get("sheet_name")
+        if not sheet_key and not sheet_name:
+            # A worksheet of the default spreadsheet
+            sheet_key, sheet_name = self.get_setting("sheet_key"), SHEET_NAME
+        return sheet_key, sheet_name, int(options.get("worksheet", WORKSHEET_INDEX))
+
+    def sqlite_path(self, directory):
+        if directory == DEFAULT_DIRECTORY:
+            return self.get_setting("sqlite_path", SQLITE_PATH)
+        return self.directories()[directory].get("sqlite_path", f"directory-{directory}.db")
+
+    def synthetic_members(self, directory):
+        return int(self.directories()[directory].get(
+            "synthetic_members", self.get_setting("synthetic_members", SYNTHETIC_MEMBERS)
+        ))
+
+    def snapshot_path(self, directory):
+        """Warm-start file of a directory, or "" when disabled"""
+        if self.get_setting("storage_backend", "sheets") == "synthetic":
+            # Regenerated on every start, so there is nothing worth restoring
+            return ""
+        default = self.get_setting("snapshot_path", SNAPSHOT_PATH)
+        if directory == DEFAULT_DIRECTORY or not default:
+            return default
+        root, ext = os.path.splitext(default)
+        return self.directories()[directory].get("snapshot_path", f"{root}-{directory}{ext}")
+
+    def snapshot_source(self, directory):
+        """Identifies a directory's data, so a saved snapshot is never restored into another one"""
+        backend = self.get_setting("storage_backend", "sheets")
+        if backend == "sqlite":
+            return f"sqlite:{os.path.abspath(self.sqlite_path(directory))}"
+        if backend == "synthetic":
+            return f"synthetic:{self.synthetic_members(directory)}"
+        sheet_key, sheet_name, worksheet = self.worksheet_location(directory)
+        return f"sheets:{sheet_key or sheet_name}:{worksheet}"
+
+    def preload_directories(self):
+        """Directories listed by the preload_directories setting that exist"""
+        preload = self.get_setting("preload_directories") or []
+        if isinstance(preload, str):
+            preload = [name.strip() for name in preload.split(",") if name.strip()]
+        directories = self.directories()
+        return [name for name in preload if name in directories]
+
+    # -------------------------------------
+    # 🏗️ DATA LAYER
+    # -------------------------------------
+    def open_worksheet(self, client, directory):
+        """Look up a directory's worksheet, by key when one is configured"""
+        # Opening by key skips the Drive title search and its metadata round trip
+        sheet_key, sheet_name, worksheet = self.worksheet_location(directory)
+        spreadsheet = client.open_by_key(sheet_key) if sheet_key else client.open(sheet_name)
+        metrics.inc("sheets_api_calls", operation="open_by_key" if sheet_key else "open")
+        return spreadsheet.get_worksheet(worksheet)
+
+    def sheets_quota(self):
+        """Sheets request budget; make one per process, since every directory shares the service account"""
+        from quota import SheetsQuota
+
+        return SheetsQuota(
+            reads_per_minute=float(self.get_setting("sheets_reads_per_minute", SHEETS_READS_PER_MINUTE)),
+            writes_per_minute=float(self.get_setting("sheets_writes_per_minute", SHEETS_WRITES_PER_MINUTE)),
+        )
+
+    def create_storage_backend(self, directory, worksheet, forget=None, quota=None):
+        """Storage of one directory, selected by the storage_backend setting ("sheets", "sqlite" or "synthetic").
+
+        ``worksheet()`` returns the directory's worksheet and ``forget()``
+        drops a cached one; ``quota()`` returns the process's shared
+        ``SheetsQuota``. They are only called for the Sheets backend.
+        """
+        from storage import SheetsBackend, SQLiteBackend, SyntheticBackend
+
+        backend = self.get_setting("storage_backend", "sheets")
+        if backend == "sqlite":
+            return SQLiteBackend(self.sqlite_path(directory))
+        if backend == "synthetic":
+            return SyntheticBackend(self.synthetic_members(directory))
+        return SheetsBackend(worksheet, forget=forget, quota=None if quota is None else quota())
+
+    def create_directory_cache(self, directory, backend):
+        """Snapshot cache of one directory over ``backend``, kept fresh by its own poller"""
+        from directory import SnapshotCache
+
+        cache = SnapshotCache(
+            backend,
+            ttl=float(self.get_setting("snapshot_ttl", SNAPSHOT_TTL)),
+            sync_mode=self.get_setting("sync_mode", "incremental"),
+            full_sync_every=int(self.get_setting("full_sync_every", FULL_SYNC_EVERY)),
+            # Restored at startup so the first request after a restart is served from disk
+            snapshot_path=self.snapshot_path(directory),
+            source=self.snapshot_source(directory),
+        )
+
+        # One poller per directory keeps its snapshot fresh however many readers it has
+        interval = float(self.get_setting("live_update_interval", LIVE_UPDATE_INTERVAL))
+        if interval > 0:
+            cache.start_polling(interval)
+        return cache
+
+    def create_registry(self, factory, on_evict=None, preload=()):
+        """Cache registry over ``factory(directory)``, warming ``preload`` together off the request path"""
+        from directory import CacheRegistry
+
+        registry = CacheRegistry(
+            factory,
+            max_directories=int(self.get_setting("max_directories", MAX_DIRECTORIES)),
+            max_members=int(self.get_setting("max_cached_members", MAX_CACHED_MEMBERS)),
+            on_evict=on_evict,
+        )
+        preload = list(dict.fromkeys(preload))
+        if preload:
+            threading.Thread(target=registry.prefetch, args=(preload,), name="directory-preload", daemon=True).start()
+        return registry
@@ -0,0 +1,726 @@
+"""Directory data layer shared by every session of the My Connections app.
+
+Nothing in here touches Streamlit, so the same code can be driven from
+background threads and from tools outside the Streamlit runtime.
+"""
+import hashlib
+import json
+import os
+import sys
+import threading
+import time
+from collections import OrderedDict, namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import metrics
+from members import COLUMNS, MemberStore
+from search import FuzzyIndex, SearchIndex
+
+SHEET_RANGE = "A:C"  # add_user writes name, username, timestamp into these columns
+
+
+# -------------------------------------
+# 🧹 NORMALIZATION
+# -------------------------------------
+TIMESTAMP_FORMAT = "%Y-%m-%d %H:%M:%S"
+
+
+def normalize_timestamp(value):
+    """``value`` in TIMESTAMP_FORMAT, or None if it is not a date and time"""
+    value = str(value).strip()
+    try:
+        parsed = datetime.fromisoformat(value)
+    except ValueError:
+        try:
+            parsed = datetime.strptime(value, TIMESTAMP_FORMAT)
+        except ValueError:
+            return None
+    # Values written by add_user are already in the canonical format
+    if len(value) == 19 and value[10] == " ":
+        return value
+    return parsed.strftime(TIMESTAMP_FORMAT)
+
+
+def normalize_records(records):
+    """Clean raw sheet records into a ``MemberStore``"""
+    with metrics.span("normalize"):
+        return _normalize(records)
+
+
+def _normalize(records):
+    """One pass over ``records``: strip, check and parse each row, keeping the
+    last row of every username compared case-insensitively."""
+    intern = sys.intern
+    timestamps = {}  # raw value -> normalized, since many rows share one
+    now = None
+    rows = {}
+    for record in records:
+        try:
+            name, username, timestamp = record["name"], record["username"], record["timestamp"]
+        except KeyError:
+            name, username, timestamp = (record.get(column, "") for column in COLUMNS)
+        if name is None or username is None or timestamp is None:
+            metrics.inc("normalize_rejected", reason="missing")
+            continue
+        username = str(username).strip()
+        if not username:
+            metrics.inc("normalize_rejected", reason="no_username")
+            continue
+
+        parsed = timestamps.get(timestamp)
+        if parsed is None:
+            parsed = timestamps[timestamp] = normalize_timestamp(timestamp) or ""
+        if not parsed:
+            # Only this row gets a substitute timestamp, not the whole sheet
+            metrics.inc("normalize_bad_timestamp")
+            now = now or datetime.now().strftime(TIMESTAMP_FORMAT)
+            parsed = now
+
+        key = username.casefold()
+        # Re-inserting moves the key to the end, so order follows each username's last row
+        if key in rows:
+            del rows[key]
+        rows[key] = (intern(str(name).strip()), intern(username), intern(parsed))
+
+    if not rows:
+        return MemberStore()
+    return MemberStore.from_interned(*zip(*rows.values()))
+
+
+def records_digest(records):
+    """Content hash of raw records, used to skip normalizing an unchanged sheet"""
+    text = "\n".join(["\x1f".join([str(record.get(column, "")) for column in COLUMNS]) for record in records])
+    return hashlib.sha1(text.encode("utf-8")).hexdigest()
+
+
+# -------------------------------------
+# 🔁 SYNC CURSOR
+# -------------------------------------
+# Where the last sync stopped: the header row, how far the backend was read
+# (sheet rows including the header, or the last SQLite id), a digest of the
+# last row read, and how many incremental syncs happened since the last
+# full read.
+SyncCursor = namedtuple("SyncCursor", ["header", "rows_seen", "tail_digest", "incremental_syncs"])
+
+
+def row_digest(row):
+    """Stable checksum of one sheet row.
+
+    Trailing empty cells are ignored: get_values pads rows to the range
+    width while batch_get leaves them off, and both must agree.
+    """
+    cells = [str(cell) for cell in row]
+    while cells and not cells[-1]:
+        cells.pop()
+    return hashlib.sha1("\x1f".join(cells).encode("utf-8")).hexdigest()
+
+
+def rows_to_records(header, rows):
+    """Map raw value rows onto the header the same way get_all_records does"""
+    records = []
+    for row in rows:
+        if not any(str(cell).strip() for cell in row):
+            continue
+        row = list(row) + [""] * (len(header) - len(row))
+        records.append(dict(zip(header, row)))
+    return records
+
+
+# -------------------------------------
+# 📸 SHARED SNAPSHOT
+# -------------------------------------
+def build_username_index(usernames, start=0, index=None):
+    """Map casefolded usernames to their row position, later rows winning"""
+    index = {} if index is None else index
+    for pos, username in enumerate(usernames, start):
+        index[username.casefold()] = pos
+    return index
+
+
+class DirectorySnapshot:
+    """Immutable view of the directory at one point in time.
+
+    Snapshots are shared between sessions; ``members`` is an immutable
+    ``MemberStore``, so filtered views never affect other readers.
+    """
+
+    __slots__ = ("members", "version", "cursor", "fetched_at", "username_index", "_search_index", "_fuzzy_index")
+
+    def __init__(self, members, version, cursor=None, fetched_at=None, username_index=None):
+        self.members = members
+        self.version = version
+        self.cursor = cursor
+        self.fetched_at = time.time() if fetched_at is None else fetched_at
+        if username_index is None:
+            username_index = build_username_index(members.usernames)
+        self.username_index = username_index
+        self._search_index = None
+        self._fuzzy_index = None
+
+    @property
+    def age(self):
+        return time.time() - self.fetched_at
+
+    @property
+    def search_index(self):
+        """Substring index, built on first use and kept for the snapshot's lifetime"""
+        if self._search_index is None:
+            self._search_index = SearchIndex(self.members.names, self.members.usernames)
+        return self._search_index
+
+    def search(self, query):
+        """Members whose name or username contains ``query``, case-insensitively"""
+        return self.members.take(self.search_index.search(query))
+
+    def fuzzy_search(self, query, k=10):
+        """Closest members to ``query`` by trigram similarity, best match first"""
+        if self._fuzzy_index is None:
+            self._fuzzy_index = FuzzyIndex(self.members.names, self.members.usernames)
+        return self.members.take(row for row, _ in self._fuzzy_index.top_k(query, k))
+
+    def lookup(self, username):
+        """Case-insensitive exact match on username as a ``Member``, or None"""
+        pos = self.username_index.get(str(username).strip().casefold())
+        return None if pos is None else self.members[pos]
+
+    def reusing_indexes(self, other):
+        """This snapshot with the lazily built indexes of ``other``, which holds the same members"""
+        self._search_index = other._search_index
+        self._fuzzy_index = other._fuzzy_index
+        return self
+
+    def with_records(self, records, version, cursor):
+        """New snapshot with ``records`` appended, reusing this snapshot's indexes"""
+        new = normalize_records(records)
+        if not new:
+            # The usual outcome of a poll; the same members keep the same indexes
+            return DirectorySnapshot(
+                self.members, version, cursor, username_index=self.username_index
+            ).reusing_indexes(self)
+
+        members = self.members.extend(new)
+        if any(username.casefold() in self.username_index for username in new.usernames):
+            # A re-added username moves rows around; positions have to be rebuilt
+            return DirectorySnapshot(members.drop_duplicates(), version, cursor)
+
+        index = build_username_index(new.usernames, len(self.members), dict(self.username_index))
+        snapshot = DirectorySnapshot(members, version, cursor, username_index=index)
+        if self._search_index is not None:
+            snapshot._search_index = self._search_index.extended(new.names, new.usernames)
+        if self._fuzzy_index is not None:
+            snapshot._fuzzy_index = self._fuzzy_index.extended(new.names, new.usernames)
+        return snapshot
+
+
+def empty_snapshot():
+    """Snapshot of an empty directory, used when nothing could be loaded"""
+    return DirectorySnapshot(MemberStore(), 0)
+
+
+# -------------------------------------
+# 💾 WARM START
+# -------------------------------------
+SNAPSHOT_FORMAT = 1
+SNAPSHOT_METADATA_KEY = b"myconnections.snapshot"
+
+
+def save_snapshot(snapshot, path, source=""):
+    """Write ``snapshot`` and its version metadata to a Parquet file.
+
+    The file is written next to ``path`` and moved into place, so readers
+    never see a half-written snapshot. Returns False when pyarrow is not
+    installed.
+    """
+    try:
+        import pyarrow as pa
+        import pyarrow.parquet as pq
+    except ImportError:
+        return False
+
+    cursor = snapshot.cursor
+    meta = {
+        "format": SNAPSHOT_FORMAT,
+        "source": source,
+        "version": snapshot.version,
+        "fetched_at": snapshot.fetched_at,
+        "cursor": None if cursor is None else cursor._asdict(),
+    }
+    members = snapshot.members
+    table = pa.table({column: pa.array(members.column(column), type=pa.string()) for column in COLUMNS})
+    table = table.replace_schema_metadata({SNAPSHOT_METADATA_KEY: json.dumps(meta)})
+
+    os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+    tmp = f"{path}.{os.getpid()}.tmp"
+    try:
+        pq.write_table(table, tmp)
+        os.replace(tmp, path)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return True
+
+
+def load_snapshot(path, source=""):
+    """Snapshot saved by ``save_snapshot``, or None if missing, unreadable or from another source"""
+    try:
+        import pyarrow.parquet as pq
+    except ImportError:
+        return None
+    if not os.path.exists(path):
+        return None
+
+    try:
+        table = pq.read_table(path)
+        meta = json.loads((table.schema.metadata or {})[SNAPSHOT_METADATA_KEY])
+        if meta.get("format") != SNAPSHOT_FORMAT or meta.get("source") != source:
+            return None
+        cursor = meta.get("cursor")
+        return DirectorySnapshot(
+            MemberStore(*(table.column(column).to_pylist() for column in COLUMNS)),
+            meta["version"],
+            None if cursor is None else SyncCursor(**cursor),
+            fetched_at=meta["fetched_at"],
+        )
+    except Exception:
+        # A corrupt or outdated file only costs the warm start
+        metrics.inc("snapshot_restore_errors")
+        return None
+
+
+class SnapshotCache:
+    """Process-wide directory snapshot with TTL and stale-while-revalidate.
+
+    A cold cache fetches synchronously. Once a snapshot exists, readers
+    always get it straight away; when it is older than ``ttl`` a single
+    background refresh is started and the next reader sees the result.
+    ``revalidate()`` syncs right away on behalf of every reader, sharing one
+    backend read between concurrent callers.
+
+    In ``"incremental"`` sync mode refreshes only request the rows appended
+    since the previous sync, with a full read every ``full_sync_every``
+    refreshes to pick up in-place edits.
+
+    With ``start_polling()`` a single background thread refreshes on a
+    fixed interval instead, so readers never trigger upstream reads and
+    freshness does not depend on how many sessions are open.
+
+    With ``snapshot_path`` every new version is also saved to disk. A new
+    process starts from that file, serving it straight away while a full
+    sync reconciles it with the backend in the background.
+    """
+
+    def __init__(self, backend, ttl=30, sync_mode="incremental", full_sync_every=20, snapshot_path=None,
+                 source=""):
+        self.backend = backend
+        self.ttl = ttl
+        self.sync_mode = sync_mode
+        self.full_sync_every = full_sync_every
+        self.last_error = None
+        self._snapshot = None
+        self._version = 0
+        self._invalidated = False
+        self._force_full = False
+        self._refreshing = False
+        self._poller = None
+        self._stop_polling = None
+        self._lock = threading.Lock()
+        # Held across a duplicate check and the append that follows it
+        self.append_lock = threading.Lock()
+        self.snapshot_path = snapshot_path
+        self.source = source
+        # Digest of the last full read and the members normalized from it
+        self._normalized = (None, None)
+        self._persisted_version = 0
+        self._persist_lock = threading.Lock()
+        if snapshot_path:
+            self._restore()
+
+    def _restore(self):
+        with metrics.span("restore_snapshot"):
+            snapshot = load_snapshot(self.snapshot_path, self.source)
+        if snapshot is None:
+            return
+        metrics.inc("snapshot_restored")
+        self._snapshot = snapshot
+        self._version = self._persisted_version = snapshot.version
+        # The file may be hours old and miss in-place edits; re-read everything, off the request path
+        self._force_full = True
+        self._revalidate_async()
+
+    @property
+    def snapshot(self):
+        return self._snapshot
+
+    @property
+    def version(self):
+        """Version of the published snapshot, 0 before the first load"""
+        snapshot = self._snapshot
+        return 0 if snapshot is None else snapshot.version
+
+    @property
+    def polling(self):
+        return self._poller is not None and self._poller.is_alive()
+
+    def start_polling(self, interval):
+        """Refresh from one background thread every ``interval`` seconds"""
+        with self._lock:
+            if self.polling:
+                return
+            self._stop_polling = threading.Event()
+            self._poller = threading.Thread(
+                target=self._poll, args=(interval, self._stop_polling), name="directory-poller", daemon=True
+            )
+            self._poller.start()
+
+    def stop_polling(self):
+        if self._stop_polling is not None:
+            self._stop_polling.set()
+
+    def _poll(self, interval, stop):
+        while not stop.wait(interval):
+            try:
+                with self._lock:
+                    self._sync()
+            except Exception as e:
+                self.last_error = e
+            metrics.inc("poller_ticks")
+
+    def get(self):
+        """Return the current snapshot, refreshing it according to the TTL"""
+        snapshot = self._snapshot
+        if snapshot is None or self._invalidated:
+            metrics.inc("snapshot_cache", result="miss")
+            return self.refresh()
+        if snapshot.age >= self.ttl and not self.polling:
+            metrics.inc("snapshot_cache", result="stale")
+            self._revalidate_async()
+        else:
+            metrics.inc("snapshot_cache", result="hit")
+        return snapshot
+
+    def refresh(self):
+        """Sync synchronously, coalescing with any refresh already running"""
+        seen = self._snapshot
+        with self._lock:
+            # Another thread refreshed while we waited for the lock
+            if self._snapshot is not seen and not self._invalidated:
+                return self._snapshot
+            try:
+                return self._sync()
+            except Exception as e:
+                self.last_error = e
+                if self._snapshot is None:
+                    raise
+                return self._snapshot
+
+    def revalidate(self, full=False, min_age=0.0):
+        """Sync now for every reader of this cache, returning the fresh snapshot.
+
+        Concurrent calls wait for and share one sync, and nothing is fetched
+        when the snapshot is younger than ``min_age`` seconds.
+        """
+        snapshot = self._snapshot
+        if snapshot is not None and snapshot.age < min_age and not self._invalidated:
+            metrics.inc("revalidate", result="skipped")
+            return snapshot
+        metrics.inc("revalidate", result="requested")
+        if full:
+            self._force_full = True
+        return self.refresh()
+
+    def append(self, row):
+        """Write ``row`` through the backend and apply it to the shared snapshot"""
+        receipt = self.backend.append(row)
+        return self.record_append(row, receipt)
+
+    def append_many(self, rows):
+        """Write ``rows`` through the backend in one call and apply them to the shared snapshot"""
+        rows = [list(row) for row in rows]
+        receipt = self.backend.append_many(rows)
+        return self._record(rows, lambda cursor: self.backend.cursor_after_append_many(cursor, rows, receipt))
+
+    def record_append(self, row, receipt=None):
+        """Apply a row this process just appended to the backend.
+
+        The sync cursor moves past the row, so the next incremental sync
+        checks that it really landed there and reloads everything if not.
+        """
+        return self._record([row], lambda cursor: self.backend.cursor_after_append(cursor, row, receipt))
+
+    def _record(self, rows, advance):
+        with self._lock:
+            previous = self._snapshot
+            cursor = None
+            if previous is not None and previous.cursor is not None:
+                cursor = advance(previous.cursor)
+            if cursor is None:
+                self._invalidated = True
+                return previous
+
+            records = [dict(zip(COLUMNS, row)) for row in rows]
+            self._version += 1
+            self._snapshot = previous.with_records(records, self._version, cursor)
+            self._persist_async(self._snapshot)
+            return self._snapshot
+
+    def _sync(self):
+        previous = self._snapshot
+        if previous is not None and self._can_sync_incrementally(previous):
+            with metrics.span("fetch_appended"):
+                appended = self.backend.fetch_appended(previous.cursor)
+            if appended is not None:
+                records, cursor = appended
+                if records:
+                    self._version += 1
+                return self._publish(previous.with_records(records, self._version, cursor))
+
+        with metrics.span("fetch_all"):
+            records, cursor = self.backend.fetch_all()
+        members = self._normalize_full(records)
+        if previous is not None and members == previous.members:
+            # Nothing changed: keep the version, the members and every index
+            return self._publish(DirectorySnapshot(
+                previous.members, previous.version, cursor, username_index=previous.username_index
+            ).reusing_indexes(previous))
+        self._version += 1
+        return self._publish(DirectorySnapshot(members, self._version, cursor))
+
+    def _normalize_full(self, records):
+        """Members for a full read, reusing the last result when the raw records hash the same"""
+        digest = records_digest(records)
+        seen_digest, members = self._normalized
+        if digest == seen_digest:
+            metrics.inc("normalize_cache", result="hit")
+            return members
+        metrics.inc("normalize_cache", result="miss")
+        members = normalize_records(records)
+        self._normalized = (digest, members)
+        return members
+
+    def _can_sync_incrementally(self, snapshot):
+        return (
+            self.sync_mode == "incremental"
+            and not self._force_full
+            and snapshot.cursor is not None
+            and snapshot.cursor.incremental_syncs < self.full_sync_every
+        )
+
+    def _publish(self, snapshot):
+        self._snapshot = snapshot
+        self._invalidated = False
+        self._force_full = False
+        self.last_error = None
+        self._persist_async(snapshot)
+        return self._snapshot
+
+    def _persist_async(self, snapshot):
+        if not self.snapshot_path or snapshot.version <= self._persisted_version:
+            return
+        threading.Thread(target=self._persist, args=(snapshot,), name="directory-persist", daemon=True).start()
+
+    def _persist(self, snapshot):
+        with self._persist_lock:
+            # A newer version was written while this one waited
+            if snapshot.version <= self._persisted_version:
+                return
+            try:
+                with metrics.span("persist_snapshot"):
+                    if save_snapshot(snapshot, self.snapshot_path, self.source):
+                        self._persisted_version = snapshot.version
+            except Exception:
+                metrics.inc("snapshot_persist_errors")
+
+    def _revalidate_async(self):
+        with self._lock:
+            if self._refreshing:
+                return
+            self._refreshing = True
+
+        def run():
+            try:
+                with self._lock:
+                    self._sync()
+            except Exception as e:
+                self.last_error = e
+            finally:
+                self._refreshing = False
+
+        threading.Thread(target=run, name="directory-revalidate", daemon=True).start()
+
+
+# -------------------------------------
+# 🗂️ VERSIONED VIEW CACHE
+# -------------------------------------
+class VersionedCache:
+    """Values derived from a snapshot, cached per directory and snapshot version.
+
+    A value is only served for the exact (directory, version) it was
+    computed from. Storing a value for a new version of a directory drops
+    that directory's older values and leaves every other directory alone;
+    ``invalidate()`` drops entries explicitly. Each directory keeps at most
+    ``max_entries`` values, least recently used first out.
+    """
+
+    def __init__(self, name, max_entries=1024):
+        self.name = name
+        self.max_entries = max_entries
+        self._entries = {}  # directory -> (version, OrderedDict of values)
+        self._lock = threading.Lock()
+
+    def get(self, directory, version, key, compute):
+        """Cached value of ``key``, computing and storing it with ``compute()`` on a miss"""
+        with self._lock:
+            current = self._entries.get(directory)
+            if current is not None and current[0] == version and key in current[1]:
+                current[1].move_to_end(key)
+                metrics.inc(f"{self.name}_cache", result="hit")
+                return current[1][key]
+
+        metrics.inc(f"{self.name}_cache", result="miss")
+        value = compute()
+        with self._lock:
+            current = self._entries.get(directory)
+            if current is None or current[0] != version:
+                current = self._entries[directory] = (version, OrderedDict())
+            values = current[1]
+            values[key] = value
+            if len(values) > self.max_entries:
+                values.popitem(last=False)
+        return value
+
+    def invalidate(self, directory=None, version=None):
+        """Drop the values of ``directory`` (all directories when None), or only those of ``version``"""
+        with self._lock:
+            directories = list(self._entries) if directory is None else [directory]
+            for name in directories:
+                current = self._entries.get(name)
+                if current is not None and (version is None or current[0] == version):
+                    del self._entries[name]
+
+
+# -------------------------------------
+# 🏫 MULTIPLE DIRECTORIES
+# -------------------------------------
+class CacheRegistry:
+    """One ``SnapshotCache`` per directory, least recently used first out.
+
+    ``factory(directory)`` builds the cache of a directory the first time
+    it is requested, outside the registry lock so a slow build (a warm-start
+    restore, a database setup) only holds up requests for that directory.
+    Caches are evicted, and their pollers stopped, once
+    there are more than ``max_directories`` of them or together they hold
+    more than ``max_members`` members. The cache just requested is never
+    evicted. ``on_evict(directory)`` runs after a directory is evicted, so
+    values derived from it can be dropped too.
+    """
+
+    def __init__(self, factory, max_directories=8, max_members=200_000, max_workers=4, on_evict=None):
+        self.factory = factory
+        self.on_evict = on_evict
+        self.max_directories = max_directories
+        self.max_members = max_members
+        self.max_workers = max_workers
+        self._caches = OrderedDict()
+        self._building = {}
+        self._lock = threading.Lock()
+
+    def __contains__(self, directory):
+        return directory in self._caches
+
+    def peek(self, directory):
+        """Cache of ``directory`` if it is loaded, without building it or marking it used"""
+        with self._lock:
+            return self._caches.get(directory)
+
+    def get(self, directory):
+        """Cache of ``directory``, built on first use and marked most recently used"""
+        with self._lock:
+            cache = self._touch(directory)
+            if cache is not None:
+                return cache
+            building = self._building.setdefault(directory, threading.Lock())
+
+        # Concurrent first requests for one directory wait for a single build
+        with building:
+            with self._lock:
+                cache = self._touch(directory)
+                if cache is not None:
+                    return cache
+            try:
+                cache = self.factory(directory)
+            finally:
+                with self._lock:
+                    self._building.pop(directory, None)
+            with self._lock:
+                self._caches[directory] = cache
+                metrics.inc("directory_cache", result="created")
+                self._touch(directory)
+            return cache
+
+    def _touch(self, directory):
+        # Called with the lock held
+        cache = self._caches.get(directory)
+        if cache is not None:
+            self._caches.move_to_end(directory)
+            self._evict()
+        return cache
+
+    def prefetch(self, directories):
+        """Load every cold directory in parallel; returns {directory: error} for those that failed"""
+        caches = {directory: self.get(directory) for directory in directories}
+        cold = [(directory, cache) for directory, cache in caches.items() if cache.snapshot is None]
+        if not cold:
+            return {}
+
+        def load(cache):
+            try:
+                cache.get()
+            except Exception as e:
+                return e
+            return None
+
+        with metrics.span("prefetch_directories"):
+            with ThreadPoolExecutor(max_workers=min(self.max_workers, len(cold)), thread_name_prefix="directory-prefetch") as pool:
+                errors = dict(zip((directory for directory, _ in cold), pool.map(load, (cache for _, cache in cold))))
+        with self._lock:
+            self._evict()
+        return {directory: error for directory, error in errors.items() if error is not None}
+
+    def evict(self, directory):
+        with self._lock:
+            cache = self._caches.pop(directory, None)
+        if cache is not None:
+            self._retire(directory, cache)
+
+    def status(self):
+        """(directory, members, version, age in seconds or None) rows, most recently used first"""
+        with self._lock:
+            caches = list(self._caches.items())
+        rows = []
+        for directory, cache in reversed(caches):
+            snapshot = cache.snapshot
+            rows.append((
+                directory,
+                0 if snapshot is None else len(snapshot.members),
+                cache.version,
+                None if snapshot is None else snapshot.age,
+            ))
+        return rows
+
+    def _members(self):
+        return sum(len(cache.snapshot.members) for cache in self._caches.values() if cache.snapshot is not None)
+
+    def _evict(self):
+        # Called with the lock held; the most recently used cache always stays
+        while len(self._caches) > 1 and (
+            len(self._caches) > self.max_directories or self._members() > self.max_members
+        ):
+            directory, cache = self._caches.popitem(last=False)
+            self._retire(directory, cache)
+            metrics.inc("directory_cache", result="evicted")
+
+    def _retire(self, directory, cache):
+        cache.stop_polling()
+        if self.on_evict is not None:
+            self.on_evict(directory)
@@ -0,0 +1,148 @@
+"""Compact in-memory member records for the class directory.
+
+A ``MemberStore`` keeps the directory column-wise, as tuples of interned
+strings: each member costs three references and repeated values such as
+timestamps are stored once. Lookups, search results, paging and rendering
+all work on the store directly; pandas is only needed to export it.
+"""
+import string
+import sys
+from collections import namedtuple
+from operator import itemgetter
+
+COLUMNS = ("name", "username", "timestamp")
+
+# One member, built on demand when a row is read from the store
+Member = namedtuple("Member", COLUMNS)
+
+
+def random_word(rng, length):
+    return "".join(rng.choice(string.ascii_lowercase) for _ in range(length))
+
+
+def generate_members(count, rng):
+    """``count`` made-up (name, username, timestamp) rows that pass the app's validation"""
+    return [
+        [
+            f"{random_word(rng, 6).title()} {random_word(rng, 8).title()}",
+            f"{random_word(rng, 5)}-{i}",
+            "2024-01-01 09:00:00",
+        ]
+        for i in range(count)
+    ]
+
+
+def intern_all(values):
+    """Tuple of ``values`` as interned strings"""
+    return tuple(sys.intern(str(value)) for value in values)
+
+
+class MemberStore:
+    """Immutable column store of (name, username, timestamp) members.
+
+    Every operation returns a new store; column tuples are shared between
+    stores wherever possible, so subsets and copies stay cheap.
+    """
+
+    __slots__ = ("names", "usernames", "timestamps", "_distinct")
+
+    def __init__(self, names=(), usernames=(), timestamps=()):
+        self.names = intern_all(names)
+        self.usernames = intern_all(usernames)
+        self.timestamps = intern_all(timestamps)
+        self._distinct = {}
+        if not len(self.names) == len(self.usernames) == len(self.timestamps):
+            raise ValueError("MemberStore columns must have the same length")
+
+    @classmethod
+    def from_interned(cls, names, usernames, timestamps):
+        """Store over column tuples whose strings are already interned, without copying them"""
+        store = cls.__new__(cls)
+        store.names = names
+        store.usernames = usernames
+        store.timestamps = timestamps
+        store._distinct = {}
+        return store
+
+    @classmethod
+    def from_records(cls, records):
+        """Store built from dicts with name, username and timestamp keys"""
+        records = list(records)
+        return cls(*([record.get(column, "") for record in records] for column in COLUMNS))
+
+    @classmethod
+    def from_frame(cls, df):
+        """Store built from a DataFrame with the directory columns"""
+        return cls(*(df[column].tolist() for column in COLUMNS))
+
+    def __eq__(self, other):
+        if not isinstance(other, MemberStore):
+            return NotImplemented
+        return self._columns() == other._columns()
+
+    __hash__ = None
+
+    def __len__(self):
+        return len(self.names)
+
+    def __iter__(self):
+        return map(Member, self.names, self.usernames, self.timestamps)
+
+    def __getitem__(self, key):
+        """The member at a position, or a sub-store for a slice"""
+        if isinstance(key, slice):
+            return MemberStore.from_interned(self.names[key], self.usernames[key], self.timestamps[key])
+        return Member(self.names[key], self.usernames[key], self.timestamps[key])
+
+    def column(self, name):
+        """All values of one column, in directory order"""
+        if name not in COLUMNS:
+            raise KeyError(name)
+        return getattr(self, f"{name}s")
+
+    def unique(self, column):
+        """Number of distinct values in ``column``, computed once per store"""
+        if column not in self._distinct:
+            self._distinct[column] = len(set(self.column(column)))
+        return self._distinct[column]
+
+    def take(self, positions):
+        """Store of the members at ``positions``, in that order"""
+        positions = list(positions)
+        if len(positions) < 2:
+            # itemgetter returns a bare value rather than a tuple for one position
+            return MemberStore.from_interned(*(tuple(col[i] for i in positions) for col in self._columns()))
+        get = itemgetter(*positions)
+        return MemberStore.from_interned(*(get(col) for col in self._columns()))
+
+    def _columns(self):
+        return self.names, self.usernames, self.timestamps
+
+    def filter(self, predicate):
+        """Store of the members for which ``predicate(member)`` is true"""
+        return self.take(i for i, member in enumerate(self) if predicate(member))
+
+    def sort(self, column="name", reverse=False):
+        """Store ordered case-insensitively by ``column``; ties keep directory order"""
+        values = self.column(column)
+        order = sorted(range(len(values)), key=lambda i: values[i].casefold(), reverse=reverse)
+        return self.take(order)
+
+    def extend(self, other):
+        """Store with the members of ``other`` appended"""
+        return MemberStore.from_interned(
+            self.names + other.names, self.usernames + other.usernames, self.timestamps + other.timestamps
+        )
+
+    def drop_duplicates(self):
+        """Store keeping only the last member of each username, compared case-insensitively"""
+        last = {username.casefold(): i for i, username in enumerate(self.usernames)}
+        if len(last) == len(self.usernames):
+            return self
+        return self.take(sorted(last.values()))
+
+    def to_frame(self):
+        """The members as a pandas DataFrame, for export and analysis"""
+        import pandas as pd
+
+        return pd.DataFrame({column: list(self.column(column)) for column in COLUMNS})
@@ -0,0 +1,105 @@
+"""Process-wide timing spans and counters for the My Connections app.
+
+All sessions in a Streamlit process share one ``REGISTRY``. Phases are
+timed with ``span()`` and events are counted with ``inc()``; the totals can
+be read back as rows for the admin panel or as Prometheus text.
+"""
+import threading
+import time
+from contextlib import contextmanager
+
+PREFIX = "myconnections"
+
+
+class MetricsRegistry:
+    """Thread-safe counters and phase timings aggregated per process"""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.started_at = time.time()
+        self.counters = {}
+        self.timings = {}
+
+    def inc(self, name, amount=1, **labels):
+        key = (name, tuple(sorted(labels.items())))
+        with self._lock:
+            self.counters[key] = self.counters.get(key, 0) + amount
+
+    def observe(self, phase, seconds):
+        with self._lock:
+            count, total, worst = self.timings.get(phase, (0, 0.0, 0.0))
+            self.timings[phase] = (count + 1, total + seconds, max(worst, seconds))
+
+    @contextmanager
+    def span(self, phase):
+        """Time the enclosed block as one occurrence of ``phase``"""
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(phase, time.perf_counter() - started)
+
+    def reset(self):
+        with self._lock:
+            self.started_at = time.time()
+            self.counters = {}
+            self.timings = {}
+
+    def timing_rows(self):
+        """(phase, count, mean ms, max ms, total s) rows sorted by total time"""
+        with self._lock:
+            timings = dict(self.timings)
+        rows = [
+            (phase, count, total / count * 1000, worst * 1000, total)
+            for phase, (count, total, worst) in timings.items()
+        ]
+        return sorted(rows, key=lambda row: row[4], reverse=True)
+
+    def counter_rows(self):
+        """(name, labels, value) rows sorted by name"""
+        with self._lock:
+            counters = dict(self.counters)
+        return sorted(
+            ((name, ", ".join(f"{k}={v}" for k, v in labels), value) for (name, labels), value in counters.items()),
+            key=lambda row: (row[0], row[1]),
+        )
+
+    def render_prometheus(self):
+        """Prometheus text exposition of every counter and phase timing"""
+        with self._lock:
+            counters = dict(self.counters)
+            timings = dict(self.timings)
+
+        lines = []
+        seen = set()
+        for (name, labels), value in sorted(counters.items()):
+            metric = f"{PREFIX}_{name}_total"
+            if metric not in seen:
+                seen.add(metric)
+                lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric}{_labels(labels)} {value}")
+
+        if timings:
+            metric = f"{PREFIX}_phase_seconds"
+            lines.append(f"# TYPE {metric} summary")
+            for phase, (count, total, _) in sorted(timings.items()):
+                lines.append(f'{metric}_sum{{phase="{phase}"}} {total:.6f}')
+                lines.append(f'{metric}_count{{phase="{phase}"}} {count}')
+            lines.append(f"# TYPE {PREFIX}_phase_seconds_max gauge")
+            for phase, (_, _, worst) in sorted(timings.items()):
+                lines.append(f'{PREFIX}_phase_seconds_max{{phase="{phase}"}} {worst:.6f}')
+
+        lines.append(f"# TYPE {PREFIX}_uptime_seconds gauge")
+        lines.append(f"{PREFIX}_uptime_seconds {time.time() - self.started_at:.0f}")
+        return "\n".join(lines) + "\n"
+
+
+def _labels(labels):
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{key}="{value}"' for key, value in labels) + "}"
+
+
+REGISTRY = MetricsRegistry()
+inc = REGISTRY.inc
+span = REGISTRY.span
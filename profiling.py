@@ -0,0 +1,111 @@
+"""Opt-in cProfile capture of app reruns.
+
+Profiling is off unless a rerun is picked for it: a share of every rerun
+set by the ``profile_reruns`` setting, or each rerun of an admin who turned
+it on for their session. Every profile is written as a pstats file to a
+local directory that keeps only the newest ones; the admin panel lists
+them and summarizes their hottest functions.
+"""
+import cProfile
+import os
+import pstats
+import threading
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+
+import metrics
+
+PROFILE_DIR = ".cache/profiles"
+KEEP_PROFILES = 20
+
+Profile = namedtuple("Profile", ["name", "path", "total_ms"])
+FunctionStats = namedtuple("FunctionStats", ["function", "calls", "own_ms", "total_ms"])
+
+
+def function_label(filename, line, name):
+    """Short "file:line(function)" label; built-ins have no file"""
+    if filename == "~":
+        return name
+    return f"{os.path.basename(filename)}:{line}({name})"
+
+
+def top_functions(path, limit=15, sort="own_ms"):
+    """The ``limit`` functions of a saved profile with the most ``sort`` time"""
+    stats = pstats.Stats(path)
+    rows = [
+        FunctionStats(function_label(*function), calls, own * 1000, total * 1000)
+        for function, (_, calls, own, total, _) in stats.stats.items()
+    ]
+    rows.sort(key=lambda row: getattr(row, sort), reverse=True)
+    return rows[:limit]
+
+
+class RerunProfiler:
+    """Writes cProfile captures to ``directory``, keeping the newest ``keep``.
+
+    Only one rerun is profiled at a time in a process; a rerun that starts
+    while another is being captured runs unprofiled. A capture nested in
+    one already running on the same thread is part of that one.
+    """
+
+    def __init__(self, directory=PROFILE_DIR, keep=KEEP_PROFILES):
+        self.directory = directory
+        self.keep = keep
+        self._lock = threading.Lock()
+        self._local = threading.local()
+
+    @contextmanager
+    def capture(self, label="rerun"):
+        """Profile the enclosed block and save it, even when it ends in an exception"""
+        if getattr(self._local, "active", False):
+            yield
+            return
+        if not self._lock.acquire(blocking=False):
+            metrics.inc("profiles", result="skipped")
+            yield
+            return
+
+        try:
+            self._local.active = True
+            profiler = cProfile.Profile()
+            profiler.enable()
+            try:
+                yield
+            finally:
+                profiler.disable()
+                self._save(profiler, label)
+        finally:
+            self._local.active = False
+            self._lock.release()
+
+    def _save(self, profiler, label):
+        os.makedirs(self.directory, exist_ok=True)
+        # Names sort by capture time, which is what rotation relies on
+        stamp = time.strftime("%Y%m%d-%H%M%S") + f"{time.time() % 1:.3f}"[1:]
+        # The total goes in the name so listing profiles never has to load them
+        total_ms = pstats.Stats(profiler).total_tt * 1000
+        path = os.path.join(self.directory, f"{stamp}-{label}-{total_ms:.0f}ms.prof")
+        profiler.dump_stats(path)
+        metrics.inc("profiles", result="saved")
+
+        names = self._names()
+        for name in names[:max(0, len(names) - self.keep)]:
+            try:
+                os.remove(os.path.join(self.directory, name))
+            except FileNotFoundError:
+                pass
+
+    def _names(self):
+        try:
+            return sorted(name for name in os.listdir(self.directory) if name.endswith(".prof"))
+        except FileNotFoundError:
+            return []
+
+    def profiles(self):
+        """Saved profiles, newest first"""
+        rows = []
+        for name in reversed(self._names()):
+            total = name[:-len("ms.prof")].rpartition("-")[2]
+            rows.append(Profile(name, os.path.join(self.directory, name), float(total) if total.isdigit() else None))
+        return rows
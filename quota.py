@@ -0,0 +1,209 @@
+"""Process-wide protection for the Google Sheets API quota.
+
+Google allows a service account roughly 60 read and 60 write requests per
+minute. Every session in a process shares the same service account, so
+the budget is tracked here, once per process, rather than per session.
+Failed calls are retried with jittered exponential backoff, and a circuit
+breaker stops calling Sheets at all while it keeps failing.
+"""
+import random
+import threading
+import time
+
+import gspread
+import requests
+
+import metrics
+
+
+class QuotaExceededError(Exception):
+    """Raised when a Sheets call would exceed the shared request budget"""
+
+    def __init__(self, kind, retry_after):
+        super().__init__(f"Sheets {kind} quota exhausted; retry in {retry_after:.0f}s")
+        self.kind = kind
+        self.retry_after = retry_after
+
+
+class TokenBucket:
+    """Thread-safe token bucket refilled continuously at ``rate`` tokens per second"""
+
+    def __init__(self, rate, capacity):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self):
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait_time(self, tokens=1):
+        """Seconds until ``tokens`` are available"""
+        with self._lock:
+            self._refill()
+            return max(0.0, (tokens - self.tokens) / self.rate)
+
+    def try_acquire(self, tokens=1):
+        with self._lock:
+            self._refill()
+            if self.tokens >= tokens:
+                self.tokens -= tokens
+                return True
+            return False
+
+    def acquire(self, tokens=1, timeout=0.0):
+        """Take ``tokens``, waiting up to ``timeout`` seconds for them to refill"""
+        deadline = time.monotonic() + timeout
+        while True:
+            if self.try_acquire(tokens):
+                return True
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return False
+            time.sleep(min(self.wait_time(tokens), remaining))
+
+
+class SheetsQuota:
+    """Separate read and write budgets shared by every session.
+
+    Reads never wait: when the read bucket is empty the caller is expected
+    to serve its last snapshot instead. Writes queue for up to
+    ``write_wait`` seconds before being rejected.
+    """
+
+    def __init__(self, reads_per_minute=60, writes_per_minute=60, burst_seconds=10, write_wait=5.0):
+        self.buckets = {
+            "read": TokenBucket(reads_per_minute / 60, max(1.0, reads_per_minute * burst_seconds / 60)),
+            "write": TokenBucket(writes_per_minute / 60, max(1.0, writes_per_minute * burst_seconds / 60)),
+        }
+        self.write_wait = write_wait
+
+    def acquire(self, kind):
+        """Spend one request of ``kind`` ("read" or "write") or raise QuotaExceededError"""
+        bucket = self.buckets[kind]
+        granted = bucket.acquire(timeout=self.write_wait if kind == "write" else 0.0)
+        if not granted:
+            metrics.inc("quota_throttled", bucket=kind)
+            raise QuotaExceededError(kind, bucket.wait_time())
+
+
+# -------------------------------------
+# 🔁 RETRY & CIRCUIT BREAKER
+# -------------------------------------
+RETRYABLE_STATUS = {429, 500, 502, 503, 504}
+
+
+def is_retryable_error(error, idempotent=True):
+    """True for quota (429), server (5xx) and network errors worth retrying.
+
+    For calls that are not idempotent only a 429 counts, since the request
+    was rejected before Sheets acted on it.
+    """
+    if isinstance(error, gspread.exceptions.APIError):
+        response = error.response
+        if response is None:
+            return False
+        return response.status_code in (RETRYABLE_STATUS if idempotent else {429})
+    return idempotent and isinstance(error, (requests.ConnectionError, requests.Timeout))
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling Sheets while the circuit breaker is open"""
+
+    def __init__(self, retry_after):
+        super().__init__(f"Google Sheets is unavailable; retrying in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+class CircuitBreaker:
+    """Stops calling a failing service for ``reset_timeout`` seconds.
+
+    After ``failure_threshold`` consecutive retryable failures the circuit
+    opens and calls fail fast. Once the timeout passes, a single trial call
+    is let through (half-open); its outcome closes or reopens the circuit.
+    A trial that never reports back does not block the circuit for good:
+    another one is let through after a further ``reset_timeout``.
+    """
+
+    def __init__(self, failure_threshold=5, reset_timeout=30.0):
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        self.state = "closed"
+        self.failures = 0
+        self.opened_at = 0.0
+        self._lock = threading.Lock()
+
+    def before_call(self):
+        with self._lock:
+            if self.state == "closed":
+                return
+            now = time.monotonic()
+            remaining = self.opened_at + self.reset_timeout - now
+            if remaining <= 0:
+                # Either the circuit is due a trial or the last trial was lost
+                self.state = "half_open"
+                self.opened_at = now
+                return
+            raise CircuitOpenError(remaining)
+
+    def cancel_trial(self):
+        """Give back a half-open trial that never reached the service"""
+        with self._lock:
+            if self.state == "half_open":
+                self.state = "open"
+                self.opened_at = time.monotonic() - self.reset_timeout
+
+    def record_success(self):
+        with self._lock:
+            self.state = "closed"
+            self.failures = 0
+
+    def record_failure(self):
+        with self._lock:
+            self.failures += 1
+            if self.state == "half_open" or self.failures >= self.failure_threshold:
+                if self.state != "open":
+                    metrics.inc("circuit_opened")
+                self.state = "open"
+                self.opened_at = time.monotonic()
+
+
+def call_with_retry(action, retries=3, base_delay=0.5, max_delay=8.0, breaker=None, before_attempt=None,
+                    idempotent=True):
+    """Run ``action()``, retrying retryable errors with full-jitter exponential backoff.
+
+    ``before_attempt`` runs ahead of every attempt (for example to spend
+    quota). Non-retryable errors, quota rejections and an open circuit
+    are raised immediately.
+    """
+    for attempt in range(retries + 1):
+        if breaker is not None:
+            breaker.before_call()
+        if before_attempt is not None:
+            try:
+                before_attempt()
+            except Exception:
+                if breaker is not None:
+                    # Nothing was sent, so the next call may make the trial instead
+                    breaker.cancel_trial()
+                raise
+        try:
+            result = action()
+        except Exception as e:
+            if breaker is not None:
+                if is_retryable_error(e):
+                    breaker.record_failure()
+                else:
+                    # The service answered; the request itself was wrong
+                    breaker.record_success()
+            if attempt == retries or not is_retryable_error(e, idempotent):
+                raise
+            metrics.inc("sheets_retries")
+            time.sleep(random.uniform(0, min(max_delay, base_delay * 2 ** attempt)))
+        else:
+            if breaker is not None:
+                breaker.record_success()
+            return result
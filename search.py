@@ -0,0 +1,176 @@
+"""Precomputed search structures for the class directory."""
+import bisect
+import re
+from array import array
+
+import numpy as np
+
+NGRAM = 3
+FIELD_SEP = "\x1f"
+
+
+def casefold(text):
+    """Normalize text for case-insensitive matching"""
+    return str(text).casefold()
+
+
+def ngrams(text, n=NGRAM):
+    """Distinct character n-grams of ``text``"""
+    return {text[i:i + n] for i in range(len(text) - n + 1)}
+
+
+def padded_ngrams(text, n=NGRAM):
+    """N-grams of ``text`` padded so word starts and ends carry weight"""
+    return ngrams(" " * (n - 1) + text + " ", n)
+
+
+class SearchIndex:
+    """Substring index over the casefolded names and usernames of a snapshot.
+
+    Queries of ``NGRAM`` characters or more read the posting list of their
+    rarest trigram and only verify those candidates. Shorter queries scan
+    one concatenated string in C instead of looping over rows.
+    """
+
+    def __init__(self, names=(), usernames=()):
+        self.haystacks = []
+        self.postings = {}
+        self.blob = ""
+        # Start of each row's line in ``blob``, so a match offset maps back to its row
+        self.offsets = []
+        self._add(names, usernames)
+
+    def __len__(self):
+        return len(self.haystacks)
+
+    def extended(self, names, usernames):
+        """Copy of this index with rows appended, sharing untouched posting lists"""
+        index = SearchIndex.__new__(SearchIndex)
+        index.haystacks = list(self.haystacks)
+        index.postings = dict(self.postings)
+        index.blob = self.blob
+        index.offsets = list(self.offsets)
+        index._add(names, usernames)
+        return index
+
+    def _add(self, names, usernames):
+        start = len(self.haystacks)
+        new = [casefold(n) + FIELD_SEP + casefold(u) for n, u in zip(names, usernames)]
+
+        added = {}
+        for row, haystack in enumerate(new, start):
+            for gram in ngrams(haystack):
+                added.setdefault(gram, []).append(row)
+        for gram, rows in added.items():
+            existing = self.postings.get(gram)
+            self.postings[gram] = array("I", rows) if existing is None else existing + array("I", rows)
+
+        offset = len(self.blob) + 1 if self.haystacks else 0
+        for haystack in new:
+            self.offsets.append(offset)
+            offset += len(haystack) + 1
+        self.blob = "\n".join([self.blob, *new]) if self.haystacks else "\n".join(new)
+        self.haystacks.extend(new)
+
+    def search(self, query):
+        """Row positions, in directory order, whose name or username contains ``query``"""
+        query = casefold(query).strip()
+        if not query:
+            return list(range(len(self.haystacks)))
+        if FIELD_SEP in query or "\n" in query:
+            return []
+
+        if len(query) < NGRAM:
+            return self._scan(query)
+
+        candidates = None
+        for gram in ngrams(query):
+            rows = self.postings.get(gram)
+            if rows is None:
+                return []
+            if candidates is None or len(rows) < len(candidates):
+                candidates = rows
+
+        haystacks = self.haystacks
+        return [row for row in candidates if query in haystacks[row]]
+
+    def _scan(self, query):
+        rows = []
+        last = -1
+        for match in re.finditer(re.escape(query), self.blob):
+            row = bisect.bisect_right(self.offsets, match.start()) - 1
+            if row != last:
+                rows.append(row)
+                last = row
+        return rows
+
+
+class FuzzyIndex:
+    """Typo-tolerant ranking over names, name words and usernames.
+
+    Every field is a sparse vector of padded trigrams, stored column-wise as
+    posting arrays. A query's overlap with all fields is accumulated with
+    NumPy, turned into a Dice coefficient, and each member scores the best
+    of its fields.
+    """
+
+    def __init__(self, names, usernames):
+        owners, sizes, postings = self._fields(names, usernames)
+        self.rows = len(names)
+        self.owners = np.array(owners, dtype=np.int32)
+        self.sizes = np.array(sizes, dtype=np.float32)
+        self.postings = {gram: np.array(ids, dtype=np.int32) for gram, ids in postings.items()}
+
+    @staticmethod
+    def _fields(names, usernames, first_row=0, first_field=0):
+        owners = []
+        sizes = []
+        postings = {}
+        for row, (name, username) in enumerate(zip(names, usernames), first_row):
+            name = casefold(name).strip()
+            fields = {name, casefold(username).strip(), *name.split()}
+            for field in fields:
+                grams = padded_ngrams(field)
+                if not grams:
+                    continue
+                field_id = first_field + len(owners)
+                owners.append(row)
+                sizes.append(len(grams))
+                for gram in grams:
+                    postings.setdefault(gram, []).append(field_id)
+        return owners, sizes, postings
+
+    def extended(self, names, usernames):
+        """Copy of this index with rows appended, sharing untouched posting lists"""
+        owners, sizes, postings = self._fields(names, usernames, self.rows, len(self.owners))
+        index = FuzzyIndex.__new__(FuzzyIndex)
+        index.rows = self.rows + len(names)
+        index.owners = np.concatenate([self.owners, np.array(owners, dtype=np.int32)])
+        index.sizes = np.concatenate([self.sizes, np.array(sizes, dtype=np.float32)])
+        index.postings = dict(self.postings)
+        for gram, ids in postings.items():
+            ids = np.array(ids, dtype=np.int32)
+            existing = index.postings.get(gram)
+            index.postings[gram] = ids if existing is None else np.concatenate([existing, ids])
+        return index
+
+    def top_k(self, query, k=10, min_score=0.3):
+        """Up to ``k`` (row, score) pairs, best first, scoring at least ``min_score``"""
+        grams = padded_ngrams(casefold(query).strip())
+        if not grams or not self.rows:
+            return []
+
+        shared = np.zeros(len(self.owners), dtype=np.float32)
+        for gram in grams:
+            ids = self.postings.get(gram)
+            if ids is not None:
+                shared[ids] += 1  # ids are unique within a posting list
+
+        field_scores = 2 * shared / (self.sizes + len(grams))
+        scores = np.zeros(self.rows, dtype=np.float32)
+        np.maximum.at(scores, self.owners, field_scores)
+
+        k = min(k, self.rows)
+        best = np.argpartition(-scores, k - 1)[:k]
+        best = best[np.argsort(-scores[best], kind="stable")]
+        return [(int(row), float(scores[row])) for row in best if scores[row] >= min_score]
@@ -0,0 +1,328 @@
+"""Storage backends for the class directory.
+
+Every backend stores (name, username, timestamp) rows with case-insensitive
+unique usernames and exposes the same append-only sync protocol used by
+``directory.SnapshotCache``:
+
+- ``fetch_all()`` returns ``(records, cursor)`` for the whole directory.
+- ``fetch_appended(cursor)`` returns the records added after ``cursor`` with
+  the new cursor, or ``None`` when the data changed in a way that needs a
+  full read.
+- ``append(row)`` writes one row and returns a backend-specific receipt.
+- ``cursor_after_append(cursor, row, receipt)`` returns the cursor that
+  includes the freshly appended row, or ``None`` if it cannot be known.
+- ``append_many(rows)`` and ``cursor_after_append_many(cursor, rows, receipt)``
+  do the same for a batch of rows written in a single call.
+"""
+import os
+import random
+import sqlite3
+import threading
+
+import gspread
+
+import metrics
+from directory import COLUMNS, SHEET_RANGE, SyncCursor, row_digest, rows_to_records
+from members import generate_members
+from quota import CircuitBreaker, call_with_retry
+
+
+class DuplicateUsernameError(Exception):
+    """Raised when a backend rejects a row because its username already exists"""
+
+
+class StorageBackend:
+    """Interface shared by all directory storage backends"""
+
+    name = "base"
+
+    def fetch_all(self):
+        raise NotImplementedError
+
+    def fetch_appended(self, cursor):
+        raise NotImplementedError
+
+    def append(self, row):
+        raise NotImplementedError
+
+    def cursor_after_append(self, cursor, row, receipt):
+        return None
+
+    def append_many(self, rows):
+        raise NotImplementedError
+
+    def cursor_after_append_many(self, cursor, rows, receipt):
+        return None
+
+
+# -------------------------------------
+# 📄 GOOGLE SHEETS
+# -------------------------------------
+def is_stale_handle_error(error):
+    """True when a Sheets error means the cached worksheet handle no longer resolves"""
+    return (
+        isinstance(error, gspread.exceptions.APIError)
+        and error.response is not None
+        and error.response.status_code in (400, 404)
+    )
+
+
+class SheetsBackend(StorageBackend):
+    """Directory stored in a Google Sheets worksheet.
+
+    ``resolve`` returns the worksheet (normally a cached lookup) and
+    ``forget`` drops that cached handle. When Sheets reports the handle
+    as gone, it is forgotten and the call is retried once with a freshly
+    resolved worksheet. Every request spends from ``quota``, a shared
+    ``quota.SheetsQuota``, when one is given. Quota and server errors are
+    retried with backoff, and ``breaker`` fails calls fast while Sheets
+    keeps erroring.
+    """
+
+    name = "sheets"
+
+    def __init__(self, resolve, forget=None, quota=None, breaker=None, retries=3):
+        self.resolve = resolve
+        self.forget = forget
+        self.quota = quota
+        self.breaker = CircuitBreaker() if breaker is None else breaker
+        self.retries = retries
+
+    def _call(self, operation, action, kind="read"):
+        def attempt():
+            metrics.inc("sheets_api_calls", operation=operation)
+            return action(self.resolve())
+
+        def spend_quota():
+            if self.quota is not None:
+                self.quota.acquire(kind)
+
+        def guarded():
+            return call_with_retry(
+                attempt,
+                retries=self.retries,
+                breaker=self.breaker,
+                before_attempt=spend_quota,
+                # A write that failed with a 5xx may still have landed; only a 429 is safe to repeat
+                idempotent=kind == "read",
+            )
+
+        try:
+            return guarded()
+        except gspread.exceptions.APIError as e:
+            if self.forget is None or not is_stale_handle_error(e):
+                raise
+            # The spreadsheet or worksheet was moved, renamed or deleted; resolve it again
+            self.forget()
+            return guarded()
+
+    def fetch_all(self):
+        """Read the whole directory range in one request"""
+        values = self._call("get_values", lambda sheet: sheet.get_values(SHEET_RANGE))
+        if not values:
+            return [], SyncCursor([], 0, row_digest([]), 0)
+
+        header = [str(cell).strip() for cell in values[0]]
+        cursor = SyncCursor(header, len(values), row_digest(values[-1]), 0)
+        return rows_to_records(header, values[1:]), cursor
+
+    def fetch_appended(self, cursor):
+        """Read only the rows appended after ``cursor``.
+
+        The header and the last previously seen row are re-read in the same
+        batch request; if either changed, rows were edited, inserted or
+        deleted and ``None`` is returned so the caller falls back to a full read.
+        """
+        if not cursor.header:
+            return None
+
+        n = cursor.rows_seen
+        header_rows, tail_rows, new_rows = self._call(
+            "batch_get", lambda sheet: sheet.batch_get(["A1:C1", f"A{n}:C{n}", f"A{n + 1}:C"])
+        )
+
+        header = [str(cell).strip() for cell in (header_rows[0] if header_rows else [])]
+        tail = tail_rows[0] if tail_rows else []
+        if header != cursor.header or row_digest(tail) != cursor.tail_digest:
+            return None
+
+        new_rows = list(new_rows)
+        if not new_rows:
+            return [], cursor._replace(incremental_syncs=cursor.incremental_syncs + 1)
+
+        return rows_to_records(header, new_rows), SyncCursor(
+            header, n + len(new_rows), row_digest(new_rows[-1]), cursor.incremental_syncs + 1
+        )
+
+    def append(self, row):
+        self._call("append_row", lambda sheet: sheet.append_row(list(row)), kind="write")
+
+    def cursor_after_append(self, cursor, row, receipt):
+        return self.cursor_after_append_many(cursor, [row], receipt)
+
+    def append_many(self, rows):
+        """Write all ``rows`` with a single append request"""
+        rows = [list(row) for row in rows]
+        self._call("append_rows", lambda sheet: sheet.append_rows(rows), kind="write")
+
+    def cursor_after_append_many(self, cursor, rows, receipt):
+        # Sheets cannot say where the rows landed. Assume they follow the
+        # last row read; the next incremental sync re-reads the last one and
+        # falls back to a full read if someone else appended first.
+        if not cursor.header or not rows:
+            return None
+        return cursor._replace(rows_seen=cursor.rows_seen + len(rows), tail_digest=row_digest(rows[-1]))
+
+
+# -------------------------------------
+# 🗄️ SQLITE
+# -------------------------------------
+SQLITE_SCHEMA = """
+CREATE TABLE IF NOT EXISTS members (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    name TEXT NOT NULL,
+    username TEXT NOT NULL COLLATE NOCASE UNIQUE,
+    timestamp TEXT NOT NULL
+)
+"""
+
+
+class SQLiteBackend(StorageBackend):
+    """Directory stored in a local SQLite database.
+
+    Usernames are unique case-insensitively at the database level, so two
+    concurrent adds of the same username cannot both succeed. Ids only
+    grow, which makes "rows after id N" the incremental sync cursor.
+    """
+
+    name = "sqlite"
+
+    def __init__(self, path="directory.db"):
+        self.path = path
+        self._local = threading.local()
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(SQLITE_SCHEMA)
+
+    def _connect(self):
+        # One connection per thread; Streamlit serves sessions from many threads
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = self._local.conn = sqlite3.connect(self.path, timeout=10)
+        return conn
+
+    def _cursor_for(self, rows, previous_syncs=None):
+        last_id = rows[-1][0] if rows else 0
+        tail = list(rows[-1][1:]) if rows else []
+        return SyncCursor(list(COLUMNS), last_id, row_digest(tail), 0 if previous_syncs is None else previous_syncs + 1)
+
+    def fetch_all(self):
+        rows = self._connect().execute(
+            "SELECT id, name, username, timestamp FROM members ORDER BY id"
+        ).fetchall()
+        return [dict(zip(COLUMNS, row[1:])) for row in rows], self._cursor_for(rows)
+
+    def fetch_appended(self, cursor):
+        conn = self._connect()
+        tail = conn.execute(
+            "SELECT name, username, timestamp FROM members WHERE id = ?", (cursor.rows_seen,)
+        ).fetchone()
+        if row_digest(list(tail) if tail else []) != cursor.tail_digest:
+            return None
+
+        rows = conn.execute(
+            "SELECT id, name, username, timestamp FROM members WHERE id > ? ORDER BY id", (cursor.rows_seen,)
+        ).fetchall()
+        if not rows:
+            return [], cursor._replace(incremental_syncs=cursor.incremental_syncs + 1)
+        return [dict(zip(COLUMNS, row[1:])) for row in rows], self._cursor_for(rows, cursor.incremental_syncs)
+
+    def append(self, row):
+        conn = self._connect()
+        try:
+            with conn:
+                return conn.execute(
+                    "INSERT INTO members (name, username, timestamp) VALUES (?, ?, ?)", tuple(row)
+                ).lastrowid
+        except sqlite3.IntegrityError as e:
+            raise DuplicateUsernameError(row[1]) from e
+
+    def cursor_after_append(self, cursor, row, receipt):
+        return self.cursor_after_append_many(cursor, [row], receipt)
+
+    def append_many(self, rows):
+        """Insert all ``rows`` in one transaction and return the id of the last one"""
+        conn = self._connect()
+        try:
+            with conn:
+                conn.executemany(
+                    "INSERT INTO members (name, username, timestamp) VALUES (?, ?, ?)", [tuple(row) for row in rows]
+                )
+                return conn.execute("SELECT last_insert_rowid()").fetchone()[0]
+        except sqlite3.IntegrityError as e:
+            # The whole batch is rolled back
+            raise DuplicateUsernameError(str(e)) from e
+
+    def cursor_after_append_many(self, cursor, rows, receipt):
+        # Only skip ahead when no other writer slipped a row in before ours;
+        # ids inside one transaction are consecutive
+        if not rows or receipt != cursor.rows_seen + len(rows):
+            return None
+        return cursor._replace(rows_seen=receipt, tail_digest=row_digest(rows[-1]))
+
+
+# -------------------------------------
+# 🧪 SYNTHETIC
+# -------------------------------------
+class SyntheticBackend(StorageBackend):
+    """``members`` generated members held in memory.
+
+    For reproducing render and search performance offline, without
+    credentials or a database. The same ``seed`` always generates the same
+    directory; members added while it runs are lost on restart.
+    """
+
+    name = "synthetic"
+
+    def __init__(self, members=1000, seed=7):
+        self.rows = generate_members(members, random.Random(seed))
+        self.usernames = {row[1].casefold() for row in self.rows}
+        self._lock = threading.Lock()
+
+    def _cursor_for(self, rows_seen, previous_syncs=None):
+        tail = self.rows[rows_seen - 1] if rows_seen else []
+        return SyncCursor(list(COLUMNS), rows_seen, row_digest(tail), 0 if previous_syncs is None else previous_syncs + 1)
+
+    def fetch_all(self):
+        with self._lock:
+            rows = list(self.rows)
+            return rows_to_records(list(COLUMNS), rows), self._cursor_for(len(rows))
+
+    def fetch_appended(self, cursor):
+        with self._lock:
+            rows = self.rows[cursor.rows_seen:]
+            return rows_to_records(list(COLUMNS), rows), self._cursor_for(len(self.rows), cursor.incremental_syncs)
+
+    def append(self, row):
+        return self.append_many([row])
+
+    def cursor_after_append(self, cursor, row, receipt):
+        return self.cursor_after_append_many(cursor, [row], receipt)
+
+    def append_many(self, rows):
+        """Add all ``rows`` or none of them, returning the new row count"""
+        rows = [list(row) for row in rows]
+        with self._lock:
+            keys = [row[1].casefold() for row in rows]
+            if len(set(keys)) != len(keys) or not self.usernames.isdisjoint(keys):
+                raise DuplicateUsernameError(", ".join(row[1] for row in rows))
+            self.rows.extend(rows)
+            self.usernames.update(keys)
+            return len(self.rows)
+
+    def cursor_after_append_many(self, cursor, rows, receipt):
+        if not rows or receipt != cursor.rows_seen + len(rows):
+            return None
+        return cursor._replace(rows_seen=receipt, tail_digest=row_digest(rows[-1]))
@@ -0,0 +1,100 @@
+"""Validation rules for directory members.
+
+The add form checks one member at a time with ``validate_name`` and
+``validate_linkedin_username``; bulk imports check whole columns with
+``name_errors`` and ``username_errors``, which clear every plainly valid
+value of a column in one regex pass and run the single-value rules only on
+the rest. A row is accepted by one exactly when it is accepted by the
+other.
+"""
+import re
+
+MAX_NAME_LENGTH = 50
+MAX_USERNAME_LENGTH = 100
+
+UNSAFE_CHARS = re.compile(r'[<>"\'&]')
+NAME_PATTERN = re.compile(r'^[a-zA-Z\s\-\'\.]+$')
+USERNAME_PATTERN = re.compile(r'^[a-zA-Z0-9\-_\.]+$')
+
+# Whole-column checks: a column is joined with a separator no valid value
+# contains, and one pass removes every value that is certainly valid. A
+# value only partly removed keeps a remainder and is checked on its own.
+SEPARATOR = "\x00"
+VALID_NAMES = re.compile(rf"[a-zA-Z\s\-'\.]{{2,{MAX_NAME_LENGTH}}}(?={SEPARATOR})")
+VALID_USERNAMES = re.compile(rf"[a-zA-Z0-9\-_\.]{{3,{MAX_USERNAME_LENGTH}}}(?={SEPARATOR})")
+
+
+def sanitize_input(text, max_length=100):
+    """Sanitize user input to prevent XSS and other attacks"""
+    if not text:
+        return ""
+
+    # Remove potentially dangerous characters, then limit length
+    return UNSAFE_CHARS.sub("", str(text).strip())[:max_length]
+
+
+def _name_error(name):
+    if not name:
+        return "Name cannot be empty"
+    if len(name) < 2:
+        return "Name must be at least 2 characters long"
+    if len(name) > MAX_NAME_LENGTH:
+        return f"Name must be less than {MAX_NAME_LENGTH} characters"
+    # Allow letters, spaces, hyphens, apostrophes
+    if not NAME_PATTERN.match(name):
+        return "Name can only contain letters, spaces, hyphens, and apostrophes"
+    return None
+
+
+def _username_error(username):
+    if not username:
+        return "Username cannot be empty"
+    if " " in username:
+        return "Username cannot contain spaces"
+    if not USERNAME_PATTERN.match(username):
+        return "Invalid characters. Use only letters, numbers, hyphens, underscores, and periods"
+    if len(username) < 3:
+        return "Username too short (min 3 characters)"
+    if len(username) > MAX_USERNAME_LENGTH:
+        return f"Username too long (max {MAX_USERNAME_LENGTH} characters)"
+    return None
+
+
+def validate_name(name):
+    """Enhanced name validation"""
+    error = _name_error(sanitize_input(name, MAX_NAME_LENGTH))
+    return (False, error) if error else (True, "Valid")
+
+
+def validate_linkedin_username(username):
+    """Enhanced LinkedIn username validation"""
+    error = _username_error(sanitize_input(username, MAX_USERNAME_LENGTH))
+    return (False, error) if error else (True, "Valid")
+
+
+def _sanitize_column(values, max_length):
+    strip_unsafe = UNSAFE_CHARS.sub
+    return [strip_unsafe("", str(value).strip())[:max_length] if value else "" for value in values]
+
+
+def _column_errors(values, valid, row_error):
+    """``row_error`` of each value, called only for values that ``valid`` does not remove"""
+    joined = SEPARATOR.join(values)
+    if not values or joined.count(SEPARATOR) != len(values) - 1:
+        # Nothing to check, or a value contains the separator itself
+        return list(map(row_error, values))
+    rest = valid.sub("", joined + SEPARATOR).split(SEPARATOR)[:-1]
+    if not any(rest) and all(values):
+        # The usual import: every value was removed, so none has an error
+        return [None] * len(values)
+    return [row_error(value) if left or not value else None for value, left in zip(values, rest)]
+
+
+def name_errors(names):
+    """Error message, or None when valid, for each name in ``names``"""
+    return _column_errors(_sanitize_column(names, MAX_NAME_LENGTH), VALID_NAMES, _name_error)
+
+
+def username_errors(usernames):
+    """Error message, or None when valid, for each username in ``usernames``"""
+    return _column_errors(_sanitize_column(usernames, MAX_USERNAME_LENGTH), VALID_USERNAMES, _username_error)